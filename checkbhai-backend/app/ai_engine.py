@@ -6,55 +6,169 @@ Supports English, Bangla, and Banglish text
 import pickle
 import os
 import json
-from typing import Tuple, Dict, Optional
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.pipeline import Pipeline
+import sys
+import threading
+from typing import Tuple, Dict, List, Optional
 import numpy as np
-from openai import AsyncOpenAI
 
+from app.classifier_artifact import ClassifierArtifact, artifact_exists, export_artifact
+from app.classifier_inference import NumpyClassifier
+from app.llm_client import get_llm_clients
+from app.micro_batcher import MicroBatcher
+from app.online_learner import OnlineClassifier
 from app.training_data import get_training_data
+from app.text_normalizer import normalize_text
+
+# Concurrent analyze_text calls are scored together: flush at this many
+# messages or after this many milliseconds, whichever comes first
+CLASSIFIER_BATCH_MAX_SIZE = int(os.getenv("CLASSIFIER_BATCH_MAX_SIZE", "64"))
+CLASSIFIER_BATCH_WAIT_MS = float(os.getenv("CLASSIFIER_BATCH_WAIT_MS", "2"))
+
+# "full": feedback refits the TF-IDF pipeline from scratch
+# "incremental": feedback updates a hashing + partial_fit NB model in place
+CLASSIFIER_LEARNING_MODE = os.getenv("CLASSIFIER_LEARNING_MODE", "full").lower()
+
+# Scam-leaning words from the classifier quoted in local explanations (0 disables)
+EXPLANATION_TOP_TERMS = int(os.getenv("EXPLANATION_TOP_TERMS", "3"))
+
+MODELS_DIR = "app/models"
+DEFAULT_MODEL_PATH = os.path.join(MODELS_DIR, "scam_classifier.pkl")
+
+# Written by the retraining service; every worker serves the model it names
+CURRENT_MODEL_POINTER = os.path.join(MODELS_DIR, "current.json")
+
+
+def build_pipeline():
+    """Unfitted TF-IDF + MultinomialNB pipeline used for full training"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.naive_bayes import MultinomialNB
+    from sklearn.pipeline import Pipeline
+    
+    return Pipeline([
+        ('tfidf', TfidfVectorizer(
+            ngram_range=(1, 3),
+            max_features=5000,
+            min_df=1,
+            max_df=0.9,
+            sublinear_tf=True,
+            analyzer='char_wb'
+        )),
+        ('clf', MultinomialNB(alpha=0.1))
+    ])
+
+
+def builtin_corpus() -> List[Tuple[str, int]]:
+    """Built-in training corpus as (normalized text, label) pairs"""
+    return [
+        (normalize_text(item['text']), 1 if item['label'] == 'Scam' else 0)
+        for item in get_training_data()
+    ]
+
+
+def read_current_model() -> Optional[Dict]:
+    """The published model pointer ({"version", "model_path", ...}), if any"""
+    try:
+        with open(CURRENT_MODEL_POINTER, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
 
 class AIEngine:
     """AI-powered scam detection using text classification and LLM reasoning"""
     
-    def __init__(self, model_path: str = "app/models/scam_classifier.pkl"):
+    def __init__(self, model_path: str = DEFAULT_MODEL_PATH, version: Optional[str] = None):
         self.model_path = model_path
-        self.model = None
+        self.version = version
+        # Memory-mapped artifact directory next to the pickle (app/models/scam_classifier/)
+        self.artifact_path = os.path.splitext(model_path)[0]
+        self._model = None
+        self._scorer = None
+        self._model_lock = threading.RLock()
+        self.learning_mode = CLASSIFIER_LEARNING_MODE
+        self.online = OnlineClassifier(os.path.join(MODELS_DIR, "online"))
+        self._batcher = MicroBatcher(
+            self._predict_proba_batch,
+            max_batch_size=CLASSIFIER_BATCH_MAX_SIZE,
+            max_wait_ms=CLASSIFIER_BATCH_WAIT_MS,
+            name="classifier",
+            size_fn=self.scoring_size
+        )
         self.is_trained = False
-        self.openai_client = None
-        
-        api_key = os.getenv("OPENAI_API_KEY")
-        if api_key:
-            self.openai_client = AsyncOpenAI(api_key=api_key)
+        # Shared with every engine version and the LangChain service (None without an API key)
+        self.openai_client = get_llm_clients().openai
+    
+    @property
+    def model(self):
+        """Classifier pipeline, loaded on first use rather than at construction"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self.load_model()
+        return self._model
+    
+    @model.setter
+    def model(self, value):
+        self._model = value
+    
+    @property
+    def scorer(self):
+        """Inference path: pure-NumPy scorer, or the sklearn pipeline if it is unsupported"""
+        if self._scorer is None:
+            with self._model_lock:
+                if self._scorer is None:
+                    self._scorer = self._build_scorer()
+        return self._scorer
+    
+    def _build_scorer(self):
+        if self.learning_mode == "incremental":
+            return self._load_online()
         
-        # Try to load existing model
-        if os.path.exists(model_path):
-            self.load_model()
-        else:
-            # Train new model if none exists
-            self.train_model()
+        # Straight from the mapped artifact: scoring never needs sklearn
+        if self._model is None and artifact_exists(self.artifact_path):
+            try:
+                scorer = NumpyClassifier.from_artifact(ClassifierArtifact(self.artifact_path))
+                self.is_trained = True
+                return scorer
+            except Exception as e:
+                print(f"NumPy scorer unavailable from artifact: {e}")
+        try:
+            return NumpyClassifier.from_pipeline(self.model)
+        except ValueError as e:
+            print(f"NumPy scorer unavailable, using sklearn pipeline: {e}")
+            return self.model
+    
+    def _load_online(self) -> OnlineClassifier:
+        """Online model from its checkpoint, bootstrapped from the corpus on first run"""
+        if not self.online.is_fitted and not self.online.load_checkpoint():
+            print("Bootstrapping incremental CheckBhai AI model...")
+            texts, labels = zip(*builtin_corpus())
+            self.online.fit(list(texts), list(labels))
+        self.is_trained = True
+        return self.online
+    
+    def scoring_size(self, text: str) -> int:
+        # Until the model is loaded, scoring may load or train it: never run that inline
+        return len(text) if self._scorer is not None else sys.maxsize
+    
+    def _predict_proba(self, text: str):
+        return self.scorer.predict_proba([normalize_text(text)])[0]
+    
+    def _predict_proba_batch(self, texts: List[str]):
+        """One vectorized predict_proba call for the whole batch"""
+        if not texts:
+            return []
+        return self.scorer.predict_proba([normalize_text(text) for text in texts])
     
     def train_model(self, save: bool = True):
-        # ... (Existing training logic remains the same)
         print("Training CheckBhai AI model...")
-        training_data = get_training_data()
-        texts = [item['text'] for item in training_data]
-        labels = [1 if item['label'] == 'Scam' else 0 for item in training_data]
-        
-        self.model = Pipeline([
-            ('tfidf', TfidfVectorizer(
-                ngram_range=(1, 3),
-                max_features=5000,
-                min_df=1,
-                max_df=0.9,
-                sublinear_tf=True,
-                analyzer='char_wb'
-            )),
-            ('clf', MultinomialNB(alpha=0.1))
-        ])
+        corpus = builtin_corpus()
+        texts = [text for text, _ in corpus]
+        labels = [label for _, label in corpus]
         
+        self.model = build_pipeline()
         self.model.fit(texts, labels)
+        self._scorer = None
         self.is_trained = True
         
         if save:
@@ -65,8 +179,8 @@ class AIEngine:
         """
         Comprehensive analysis using both local model and LLM if available
         """
-        # 1. Local Model Prediction
-        proba = self.model.predict_proba([text])[0]
+        # 1. Local Model Prediction (micro-batched with concurrent requests)
+        proba = await self._batcher.submit(text)
         confidence = float(proba[1])
         prediction = "High Risk" if confidence > 0.5 else "Low Risk"
         
@@ -85,7 +199,8 @@ class AIEngine:
                 from app.services.ai_service import get_ai_service
                 ai_service = get_ai_service()
                 llm_result = await ai_service.analyze_message(text)
-                if llm_result:
+                # A fallback (LLM down, past its deadline, circuit open) keeps the local result
+                if llm_result and llm_result.get("provider") != "fallback":
                     result.update({
                         "explanation_en": llm_result.get("explanation_en", result["explanation_en"]),
                         "explanation_bn": llm_result.get("explanation_bn", result["explanation_bn"]),
@@ -132,14 +247,49 @@ class AIEngine:
 
     def predict(self, text: str) -> Tuple[str, float]:
         # Legacy support for existing routers
-        proba = self.model.predict_proba([text])[0]
+        return self._label(self._predict_proba(text))
+
+    def predict_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Predict many messages with a single vectorized scoring call"""
+        return [self._label(proba) for proba in self._predict_proba_batch(texts)]
+
+    def analyze(self, text: str) -> Dict:
+        # Synchronous wrapper for legacy support
+        return self._analysis(*self.predict(text))
+
+    def analyze_batch(self, texts: List[str]) -> List[Dict]:
+        """Batch version of analyze(); results are in input order"""
+        return [self._analysis(prediction, confidence) for prediction, confidence in self.predict_batch(texts)]
+
+    def explain(self, text: str, k: int = EXPLANATION_TOP_TERMS) -> List[str]:
+        """Words that weigh most towards Scam in the local classifier (blocking)"""
+        return self.explain_batch([text], k)[0]
+
+    def explain_batch(self, texts: List[str], k: int = EXPLANATION_TOP_TERMS) -> List[List[str]]:
+        """
+        explain() for many messages. Only the NumPy scorer exposes per-feature
+        weights; the sklearn fallback and the hashed online model give no terms.
+        """
+        scorer = self.scorer
+        if not k or not isinstance(scorer, NumpyClassifier):
+            return [[] for _ in texts]
+        return [[word for word, _ in scorer.top_terms(normalize_text(text), label=1, k=k)] for text in texts]
+
+    def assess_batch(self, texts: List[str], k: int = EXPLANATION_TOP_TERMS) -> List[Tuple[float, List[str]]]:
+        """(Scam probability, explain() words) per message, for the tiered /check pipeline"""
+        if not texts:
+            return []
+        probabilities = [float(proba[1]) for proba in self._predict_proba_batch(texts)]
+        return list(zip(probabilities, self.explain_batch(texts, k)))
+
+    @staticmethod
+    def _label(proba) -> Tuple[str, float]:
         if proba[1] > 0.5:
             return "Scam", float(proba[1])
         return "Legit", float(proba[0])
 
-    def analyze(self, text: str) -> Dict:
-        # Synchronous wrapper for legacy support
-        prediction, confidence = self.predict(text)
+    @staticmethod
+    def _analysis(prediction: str, confidence: float) -> Dict:
         return {
             "prediction": prediction,
             "confidence": float(confidence),
@@ -151,20 +301,54 @@ class AIEngine:
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
         with open(self.model_path, 'wb') as f:
             pickle.dump(self.model, f)
-
-    def load_model(self):
         try:
-            with open(self.model_path, 'rb') as f:
-                self.model = pickle.load(f)
-            self.is_trained = True
+            export_artifact(self.model, self.artifact_path)
         except Exception as e:
-            self.train_model()
+            print(f"Classifier artifact export failed: {e}")
+
+    def load_model(self):
+        """Load order: memory-mapped artifact, then pickle, then train from scratch"""
+        if artifact_exists(self.artifact_path):
+            try:
+                self.model = ClassifierArtifact(self.artifact_path).to_pipeline()
+                self.is_trained = True
+                return
+            except Exception as e:
+                print(f"Classifier artifact load failed, falling back to pickle: {e}")
+        
+        if os.path.exists(self.model_path):
+            try:
+                with open(self.model_path, 'rb') as f:
+                    self.model = pickle.load(f)
+                self.is_trained = True
+            except Exception as e:
+                print(f"Classifier pickle load failed, retraining: {e}")
+            else:
+                # Upgrade older deployments to the shared, memory-mapped format
+                try:
+                    export_artifact(self.model, self.artifact_path)
+                except Exception as e:
+                    print(f"Classifier artifact export failed: {e}")
+                return
+
+        self.train_model()
 
     def retrain_with_feedback(self, new_texts: list, new_labels: list):
-        training_data = get_training_data()
-        all_texts = [item['text'] for item in training_data] + new_texts
-        all_labels = [1 if item['label'] == 'Scam' else 0 for item in training_data] + new_labels
+        if self.learning_mode == "incremental":
+            # Cost proportional to the feedback batch (plus a periodic full refit)
+            with self._model_lock:
+                self._load_online()
+            refit = self.online.partial_fit(new_texts, new_labels, corpus=builtin_corpus)
+            print(f"Incremental update applied ({'full refit' if refit else 'partial_fit'}), "
+                  f"samples seen: {self.online.samples_seen}")
+            self._scorer = self.online
+            return True
+        
+        corpus = builtin_corpus()
+        all_texts = [text for text, _ in corpus] + [normalize_text(t) for t in new_texts]
+        all_labels = [label for _, label in corpus] + new_labels
         self.model.fit(all_texts, all_labels)
+        self._scorer = None
         self.save_model()
         return True
 
@@ -172,8 +356,20 @@ class AIEngine:
 _ai_engine = None
 
 def get_ai_engine():
-    """Get or create AI engine instance"""
+    """Get or create AI engine instance (the published model version, if any)"""
     global _ai_engine
     if _ai_engine is None:
-        _ai_engine = AIEngine()
+        current = read_current_model()
+        if current:
+            _ai_engine = AIEngine(model_path=current["model_path"], version=current["version"])
+        else:
+            _ai_engine = AIEngine()
     return _ai_engine
+
+def swap_ai_engine(engine: AIEngine):
+    """
+    Replace the shared engine with a fully loaded one. Callers that already
+    hold the old engine finish their predictions on it.
+    """
+    global _ai_engine
+    _ai_engine = engine
@@ -0,0 +1,153 @@
+"""
+CheckBhai Circuit Breaker - Stop calling a provider that is failing or slow
+    closed     calls go through; failures and slow calls are tracked
+    open       calls are rejected at once until reset_seconds have passed
+    half_open  a single probe call is let through: success closes the
+               breaker, failure opens it again
+The breaker trips after `failure_threshold` consecutive failures, or when at
+least `slow_call_rate` of the last `window` calls took longer than
+`slow_call_ms`. A probe that never reports back within `probe_timeout`
+seconds is given up on, and the next call becomes the probe.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from app.metrics import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider while its breaker is open"""
+
+
+class CircuitBreaker:
+    """Thread-safe: sync wrappers call the provider from their own threads"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0,
+                 slow_call_ms: float = 5000.0, slow_call_rate: float = 0.5, window: int = 20,
+                 probe_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate = slow_call_rate
+        self.window = max(1, window)
+        self.probe_timeout = probe_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_trip_reason: Optional[str] = None
+        self._recent_slow = deque(maxlen=self.window)
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+        self._state_gauge = metrics.gauge(f"{name}.state")
+        self._trips = metrics.counter(f"{name}.trips")
+        self._rejected = metrics.counter(f"{name}.rejected")
+        self._failures = metrics.counter(f"{name}.failures")
+        self._slow_calls = metrics.counter(f"{name}.slow_calls")
+        self._lost_probes = metrics.counter(f"{name}.lost_probes")
+
+    def allow(self) -> bool:
+        """May a call go out now? In half-open state only one probe at a time."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if (self.state == HALF_OPEN and self._probe_in_flight
+                    and time.monotonic() - self._probe_started_at >= self.probe_timeout):
+                self._lost_probes.inc()
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._probe_started_at = time.monotonic()
+                return True
+            self._rejected.inc()
+            return False
+
+    def available(self) -> bool:
+        """
+        Would a call be let through now (closed, or a probe slot free)? Unlike
+        allow(), claims nothing: callers check it before queueing for a call.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                return now - self.opened_at >= self.reset_seconds
+            if self.state == HALF_OPEN and self._probe_in_flight:
+                return now - self._probe_started_at >= self.probe_timeout
+            return True
+
+    def record_success(self, elapsed_ms: float):
+        with self._lock:
+            slow = elapsed_ms > self.slow_call_ms
+            if slow:
+                self._slow_calls.inc()
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if slow:
+                    self._trip(f"probe took {elapsed_ms:.0f} ms")
+                    return
+                self._recent_slow.clear()
+                self.consecutive_failures = 0
+                self._set_state(CLOSED)
+                return
+            self.consecutive_failures = 0
+            self._recent_slow.append(slow)
+            if len(self._recent_slow) == self.window:
+                rate = sum(self._recent_slow) / self.window
+                if rate >= self.slow_call_rate:
+                    self._trip(f"{rate:.0%} of the last {self.window} calls slower than {self.slow_call_ms:.0f} ms")
+
+    def record_failure(self, reason: str = "error"):
+        with self._lock:
+            self._failures.inc()
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                self._trip(f"probe failed: {reason}")
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._trip(f"{self.consecutive_failures} consecutive failures (last: {reason})")
+
+    def record_cancelled(self):
+        """The caller went away (client disconnect, shutdown): says nothing about the provider"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def _trip(self, reason: str):
+        self._trips.inc()
+        self.opened_at = time.monotonic()
+        self.last_trip_reason = reason
+        self._recent_slow.clear()
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._state_gauge.set(STATE_VALUES[state])
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "recent_slow_calls": sum(self._recent_slow),
+                "window": self.window,
+                "retry_in_seconds": retry_in,
+                "last_trip_reason": self.last_trip_reason,
+                "trips": self._trips.value,
+                "rejected": self._rejected.value
+            }
@@ -0,0 +1,119 @@
+"""
+CheckBhai Classifier Artifact - Compact, memory-mappable model format
+A fitted TF-IDF + MultinomialNB pipeline stored as plain NumPy arrays:
+
+    <artifact_dir>/
+        meta.json               vectorizer params, classes, format version
+        vocabulary.npy          feature terms, ordered by feature index
+        idf.npy                 IDF weights (n_features,)
+        feature_log_prob.npy    NB log P(feature | class) (n_classes, n_features)
+        class_log_prior.npy     NB log P(class) (n_classes,)
+
+Arrays are opened with mmap_mode='r', so every uvicorn worker on a host
+shares the same page-cache pages instead of holding its own unpickled copy.
+"""
+
+import json
+import os
+import shutil
+from typing import Dict, Optional
+
+import numpy as np
+
+ARTIFACT_FORMAT_VERSION = 1
+
+# TfidfVectorizer params needed to rebuild an identical analyzer
+VECTORIZER_PARAMS = (
+    "analyzer", "ngram_range", "lowercase", "sublinear_tf", "norm", "use_idf", "smooth_idf"
+)
+
+
+def export_artifact(pipeline, directory: str, extra_meta: Optional[Dict] = None):
+    """
+    Write a fitted Pipeline([('tfidf', TfidfVectorizer), ('clf', MultinomialNB)])
+    as an artifact directory. Written to a temporary directory first and then
+    renamed into place, so readers never see a half-written artifact.
+    """
+    vectorizer = pipeline.named_steps["tfidf"]
+    classifier = pipeline.named_steps["clf"]
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    params = vectorizer.get_params()
+    meta = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "vectorizer": {name: params[name] for name in VECTORIZER_PARAMS},
+        "classes": [int(c) for c in classifier.classes_],
+        "n_features": len(terms)
+    }
+    meta["vectorizer"]["ngram_range"] = list(meta["vectorizer"]["ngram_range"])
+    meta.update(extra_meta or {})
+
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    np.save(os.path.join(staging, "vocabulary.npy"), np.array(terms, dtype=str))
+    np.save(os.path.join(staging, "idf.npy"), np.asarray(vectorizer.idf_, dtype=np.float64))
+    np.save(os.path.join(staging, "feature_log_prob.npy"), np.asarray(classifier.feature_log_prob_, dtype=np.float64))
+    np.save(os.path.join(staging, "class_log_prior.npy"), np.asarray(classifier.class_log_prior_, dtype=np.float64))
+    with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    # Swap directories: old -> backup, staging -> live, drop backup
+    backup = f"{directory}.old-{os.getpid()}"
+    if os.path.exists(directory):
+        os.replace(directory, backup)
+    os.replace(staging, directory)
+    shutil.rmtree(backup, ignore_errors=True)
+
+
+def artifact_exists(directory: str) -> bool:
+    return os.path.exists(os.path.join(directory, "meta.json"))
+
+
+class ClassifierArtifact:
+    """Memory-mapped view of an exported classifier"""
+
+    def __init__(self, directory: str, mmap: bool = True):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported classifier artifact format: {self.meta.get('format_version')}")
+
+        mmap_mode = "r" if mmap else None
+        self.terms = np.load(os.path.join(directory, "vocabulary.npy"), mmap_mode=mmap_mode)
+        self.idf = np.load(os.path.join(directory, "idf.npy"), mmap_mode=mmap_mode)
+        self.feature_log_prob = np.load(os.path.join(directory, "feature_log_prob.npy"), mmap_mode=mmap_mode)
+        self.class_log_prior = np.load(os.path.join(directory, "class_log_prior.npy"), mmap_mode=mmap_mode)
+        self.classes = np.array(self.meta["classes"])
+        self._vocabulary = None
+
+    @property
+    def vocabulary(self) -> Dict[str, int]:
+        """term -> feature index (built on first use; the only per-worker copy)"""
+        if self._vocabulary is None:
+            self._vocabulary = {str(term): index for index, term in enumerate(self.terms)}
+        return self._vocabulary
+
+    def to_pipeline(self):
+        """Rebuild a scikit-learn Pipeline backed by the mapped arrays"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.naive_bayes import MultinomialNB
+        from sklearn.pipeline import Pipeline
+
+        params = dict(self.meta["vectorizer"])
+        params["ngram_range"] = tuple(params["ngram_range"])
+        vectorizer = TfidfVectorizer(**params)
+        vectorizer.vocabulary_ = self.vocabulary
+        vectorizer.idf_ = self.idf
+
+        classifier = MultinomialNB()
+        classifier.classes_ = self.classes
+        classifier.feature_log_prob_ = self.feature_log_prob
+        classifier.class_log_prior_ = self.class_log_prior
+        classifier.n_features_in_ = len(self.terms)
+
+        return Pipeline([("tfidf", vectorizer), ("clf", classifier)])
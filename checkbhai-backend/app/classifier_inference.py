@@ -0,0 +1,203 @@
+"""
+CheckBhai Classifier Inference - Pure-NumPy scoring for the scam classifier
+Reproduces TfidfVectorizer(analyzer='char_wb') + MultinomialNB.predict_proba
+from the fitted arrays alone: n-gram lookup, TF-IDF weighting, a sparse dot
+product against feature_log_prob_ and log-sum-exp normalization. No sklearn
+import, no sparse matrix or Pipeline machinery per call.
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from app.classifier_artifact import ClassifierArtifact
+
+# Stripped from words reported by top_terms ("bkash!" -> "bkash")
+WORD_PUNCTUATION = ".,!?:;'\"()[]{}<>"
+
+
+def char_wb_ngrams(text: str, min_n: int, max_n: int) -> List[str]:
+    """Character n-grams inside word boundaries, padded with spaces (sklearn 'char_wb')"""
+    ngrams = []
+    append = ngrams.append
+    for word in text.split():
+        word = " " + word + " "
+        length = len(word)
+        for n in range(min_n, max_n + 1):
+            if length <= n:
+                # A short word is counted once, whole, and longer n are skipped
+                append(word)
+                break
+            for offset in range(length - n + 1):
+                append(word[offset:offset + n])
+    return ngrams
+
+
+class NumpyClassifier:
+    """
+    Scores text with the fitted TF-IDF vocabulary and NB log-probabilities.
+    IDF is folded into the class weights up front, so each message costs one
+    n-gram pass and one vocabulary lookup per distinct n-gram; the arithmetic
+    is vectorized across the whole batch.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, feature_log_prob: np.ndarray,
+                 class_log_prior: np.ndarray, classes: np.ndarray, ngram_range: Tuple[int, int] = (1, 1),
+                 lowercase: bool = True, sublinear_tf: bool = False, norm: str = "l2", use_idf: bool = True):
+        if norm not in ("l2", "l1", None):
+            raise ValueError(f"Unsupported norm: {norm}")
+        self.vocabulary = vocabulary
+        self.min_n, self.max_n = ngram_range
+        self.lowercase = lowercase
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self.classes = np.asarray(classes)
+        self.class_log_prior = np.asarray(class_log_prior, dtype=np.float64)
+
+        idf = np.asarray(idf, dtype=np.float64) if use_idf else np.ones(feature_log_prob.shape[1])
+        self.idf = idf
+        # (n_features, n_classes): row j holds idf_j * log P(feature_j | class)
+        self.weights = np.ascontiguousarray((np.asarray(feature_log_prob, dtype=np.float64) * idf).T)
+
+    @classmethod
+    def from_artifact(cls, artifact: ClassifierArtifact) -> "NumpyClassifier":
+        params = artifact.meta["vectorizer"]
+        if params["analyzer"] != "char_wb":
+            raise ValueError(f"Unsupported analyzer: {params['analyzer']}")
+        return cls(
+            vocabulary=artifact.vocabulary,
+            idf=artifact.idf,
+            feature_log_prob=artifact.feature_log_prob,
+            class_log_prior=artifact.class_log_prior,
+            classes=artifact.classes,
+            ngram_range=tuple(params["ngram_range"]),
+            lowercase=params["lowercase"],
+            sublinear_tf=params["sublinear_tf"],
+            norm=params["norm"],
+            use_idf=params["use_idf"]
+        )
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> "NumpyClassifier":
+        """Build from a fitted Pipeline([('tfidf', ...), ('clf', MultinomialNB)])"""
+        vectorizer = pipeline.named_steps["tfidf"]
+        classifier = pipeline.named_steps["clf"]
+        if vectorizer.analyzer != "char_wb" or vectorizer.preprocessor or vectorizer.strip_accents:
+            raise ValueError("Only plain char_wb TF-IDF vectorizers are supported")
+        return cls(
+            vocabulary=vectorizer.vocabulary_,
+            idf=vectorizer.idf_ if vectorizer.use_idf else None,
+            feature_log_prob=classifier.feature_log_prob_,
+            class_log_prior=classifier.class_log_prior_,
+            classes=classifier.classes_,
+            ngram_range=vectorizer.ngram_range,
+            lowercase=vectorizer.lowercase,
+            sublinear_tf=vectorizer.sublinear_tf,
+            norm=vectorizer.norm,
+            use_idf=vectorizer.use_idf
+        )
+
+    def _features(self, text: str) -> Tuple[List[int], List[int]]:
+        """Vocabulary indices and raw counts of the n-grams in one text"""
+        if self.lowercase:
+            text = text.lower()
+        vocabulary = self.vocabulary
+        indices = []
+        counts = []
+        for ngram, count in Counter(char_wb_ngrams(text, self.min_n, self.max_n)).items():
+            index = vocabulary.get(ngram)
+            if index is not None:
+                indices.append(index)
+                counts.append(count)
+        return indices, counts
+
+    def _joint_log_likelihood(self, texts: List[str]) -> np.ndarray:
+        """
+        jll = x . flp.T + prior for every text, with x = tf * idf / ||tf * idf||.
+        The whole batch is flattened into one (row, feature, tf) triple list,
+        so the NumPy work is a handful of calls regardless of batch size.
+        """
+        rows, indices, tf = [], [], []
+        for row, text in enumerate(texts):
+            text_indices, text_counts = self._features(text)
+            rows.extend([row] * len(text_indices))
+            indices.extend(text_indices)
+            tf.extend(text_counts)
+
+        n_texts = len(texts)
+        jll = np.zeros((n_texts, len(self.classes)))
+        if indices:
+            rows = np.array(rows)
+            indices = np.array(indices)
+            tf = np.array(tf, dtype=np.float64)
+            if self.sublinear_tf:
+                tf = np.log(tf) + 1
+            contributions = tf[:, None] * self.weights[indices]
+            for column in range(jll.shape[1]):
+                jll[:, column] = np.bincount(rows, weights=contributions[:, column], minlength=n_texts)
+
+            if self.norm == "l2":
+                norms = np.sqrt(np.bincount(rows, weights=(tf * self.idf[indices]) ** 2, minlength=n_texts))
+            elif self.norm == "l1":
+                norms = np.bincount(rows, weights=tf * self.idf[indices], minlength=n_texts)
+            else:
+                norms = np.ones(n_texts)
+            # Texts without known n-grams score as the priors alone
+            norms[norms == 0] = 1
+            jll /= norms[:, None]
+        return jll + self.class_log_prior
+
+    def predict_log_proba(self, texts: Iterable[str]) -> np.ndarray:
+        jll = self._joint_log_likelihood(list(texts))
+        # Log-sum-exp normalization
+        top = jll.max(axis=1, keepdims=True)
+        log_norm = top + np.log(np.exp(jll - top).sum(axis=1, keepdims=True))
+        return jll - log_norm
+
+    def predict_proba(self, texts: Iterable[str]) -> np.ndarray:
+        """Same contract as Pipeline.predict_proba"""
+        return np.exp(self.predict_log_proba(texts))
+
+    def top_terms(self, text: str, label=1, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Words of one text that push it most towards `label`, strongest first.
+        Each n-gram contributes its TF-IDF weight times the NB log-odds of
+        `label` against the other classes; char_wb n-grams never cross a
+        word boundary, so every contribution is credited to the word it came
+        from. Returns (word, log-odds contribution) pairs above zero.
+        """
+        if self.lowercase:
+            text = text.lower()
+        target = int(np.flatnonzero(self.classes == label)[0])
+        others = [column for column in range(len(self.classes)) if column != target]
+        # (n_features,) idf_j * (log P(j | label) - mean log P(j | other))
+        log_odds = self.weights[:, target] - self.weights[:, others].mean(axis=1)
+
+        words = text.split()
+        occurrences = [char_wb_ngrams(word, self.min_n, self.max_n) for word in words]
+        tf = Counter(ngram for ngrams in occurrences for ngram in ngrams)
+        weights = {}
+        for ngram, count in tf.items():
+            index = self.vocabulary.get(ngram)
+            if index is not None:
+                weight = np.log(count) + 1 if self.sublinear_tf else count
+                # Split the n-gram's TF weight evenly over its occurrences
+                weights[ngram] = (index, weight * self.idf[index], weight / count)
+        if not weights:
+            return []
+
+        values = np.array([value for _, value, _ in weights.values()])
+        norm = {"l2": np.sqrt((values ** 2).sum()), "l1": values.sum()}.get(self.norm, 1.0) or 1.0
+
+        scores: Dict[str, float] = {}
+        for word, ngrams in zip(words, occurrences):
+            score = 0.0
+            for ngram in ngrams:
+                if ngram in weights:
+                    index, _, share = weights[ngram]
+                    score += share * log_odds[index]
+            # A repeated word is reported once, with its per-occurrence score
+            scores[word.strip(WORD_PUNCTUATION) or word] = score / norm
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [(word, float(score)) for word, score in ranked[:k] if score > 0]
@@ -0,0 +1,254 @@
+"""
+CheckBhai Corpus Cache - Vectorize each training sample once
+The training corpus (built-in samples plus TrainingData rows) is kept on disk
+as a sparse n-gram count matrix over an append-only vocabulary:
+
+    <directory>/state.json     watermark (created_at, id), built-in corpus digest
+    <directory>/terms.npy      n-gram for each count column
+    <directory>/counts.npz     (samples x terms) raw counts, CSR
+    <directory>/hashes.npy     sha1 of each normalized sample (dedupe key)
+    <directory>/labels.npy     1 = Scam, 0 = Legit
+
+A retrain tokenizes only rows added since the last fit. The TF-IDF
+vocabulary selection (max_df, max_features), IDF and NB are then fit from
+the cached counts, giving the same model TfidfVectorizer.fit would.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.text_normalizer import normalize_text
+
+CORPUS_CACHE_DIR = os.getenv("CORPUS_CACHE_DIR", "app/models/corpus_cache")
+
+Watermark = Tuple[datetime, str]
+
+
+def text_hash(normalized_text: str) -> str:
+    return hashlib.sha1(normalized_text.encode("utf-8")).hexdigest()
+
+
+def corpus_digest(samples: Sequence[Tuple[str, int]]) -> str:
+    """Fingerprint of the built-in corpus; a change invalidates the cache"""
+    digest = hashlib.sha1()
+    for text, label in samples:
+        digest.update(f"{label}\t{text}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def read_state(directory: str = CORPUS_CACHE_DIR) -> Optional[Dict]:
+    try:
+        with open(os.path.join(directory, "state.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_watermark(directory: str = CORPUS_CACHE_DIR, builtin_digest: Optional[str] = None) -> Optional[Watermark]:
+    """(created_at, id) of the last cached TrainingData row, None if a full read is needed"""
+    state = read_state(directory)
+    if not state or not state.get("last_created_at"):
+        return None
+    if builtin_digest and state.get("builtin_digest") != builtin_digest:
+        return None
+    return datetime.fromisoformat(state["last_created_at"]), state["last_id"]
+
+
+class CorpusCache:
+    """Incrementally maintained n-gram count matrix for the training corpus"""
+
+    def __init__(self, pipeline, directory: str = CORPUS_CACHE_DIR):
+        # The unfitted pipeline supplies the analyzer and the TF-IDF/NB params
+        self.pipeline = pipeline
+        self.analyzer = pipeline.named_steps['tfidf'].build_analyzer()
+        self.directory = directory
+        self.terms: List[str] = []
+        self.columns: Dict[str, int] = {}
+        self.rows: Dict[str, int] = {}
+        self.labels: List[int] = []
+        self.counts = None
+        self.state: Dict = {}
+
+    @contextmanager
+    def locked(self):
+        """Serialize cache updates across workers and training processes"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield self
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self, builtin: Sequence[Tuple[str, int]]):
+        """Open the cache, rebuilding it when missing or when the built-in corpus changed"""
+        import scipy.sparse as sp
+
+        digest = corpus_digest(builtin)
+        state = read_state(self.directory)
+        if state and state.get("builtin_digest") == digest:
+            try:
+                self.terms = [str(term) for term in np.load(os.path.join(self.directory, "terms.npy"))]
+                hashes = [str(h) for h in np.load(os.path.join(self.directory, "hashes.npy"))]
+                self.labels = [int(label) for label in np.load(os.path.join(self.directory, "labels.npy"))]
+                self.counts = sp.load_npz(os.path.join(self.directory, "counts.npz")).tocsr()
+                self.columns = {term: index for index, term in enumerate(self.terms)}
+                self.rows = {h: index for index, h in enumerate(hashes)}
+                self.state = state
+                if not (len(self.labels) == len(self.rows) == self.counts.shape[0] == state.get("samples")):
+                    raise ValueError("files from different saves")
+                return
+            except (OSError, ValueError) as e:
+                print(f"Corpus cache unreadable, rebuilding: {e}")
+
+        self.terms, self.columns, self.rows, self.labels = [], {}, {}, []
+        self.counts = sp.csr_matrix((0, 0), dtype=np.int64)
+        self.state = {"builtin_digest": digest, "last_created_at": None, "last_id": None}
+        self.add(builtin, normalized=True)
+
+    def add(self, samples: Sequence[Tuple[str, int]], normalized: bool = False) -> Tuple[int, int]:
+        """
+        Add (text, label) samples. Known texts only have their label updated
+        (later samples win); only unseen texts are tokenized.
+        Returns (added, relabelled).
+        """
+        import scipy.sparse as sp
+
+        indptr, indices, data = [0], [], []
+        added = relabelled = 0
+        for text, label in samples:
+            text = text if normalized else normalize_text(text)
+            key = text_hash(text)
+            row = self.rows.get(key)
+            if row is not None:
+                if self.labels[row] != label:
+                    self.labels[row] = label
+                    relabelled += 1
+                continue
+
+            counts: Dict[int, int] = {}
+            for ngram in self.analyzer(text):
+                column = self.columns.get(ngram)
+                if column is None:
+                    column = len(self.terms)
+                    self.columns[ngram] = column
+                    self.terms.append(ngram)
+                counts[column] = counts.get(column, 0) + 1
+            indices.extend(counts)
+            data.extend(counts.values())
+            indptr.append(len(indices))
+            self.rows[key] = len(self.labels)
+            self.labels.append(label)
+            added += 1
+
+        if added:
+            block = sp.csr_matrix((data, indices, indptr), shape=(added, len(self.terms)), dtype=np.int64)
+            existing = self.counts
+            existing.resize((existing.shape[0], len(self.terms)))
+            self.counts = sp.vstack([existing, block], format="csr")
+        return added, relabelled
+
+    def save(self, watermark: Optional[Watermark] = None):
+        """Persist the cache; each file is written to a temp name and renamed"""
+        import scipy.sparse as sp
+
+        if watermark:
+            self.state["last_created_at"] = watermark[0].isoformat()
+            self.state["last_id"] = str(watermark[1])
+        self.state["samples"] = len(self.labels)
+        self.state["terms"] = len(self.terms)
+        self.state["updated_at"] = datetime.utcnow().isoformat()
+
+        os.makedirs(self.directory, exist_ok=True)
+        pid = os.getpid()
+        for name, array in (("terms", np.array(self.terms, dtype=str)),
+                            ("hashes", np.array(self.row_hashes(), dtype=str)),
+                            ("labels", np.array(self.labels, dtype=np.int8))):
+            staging = os.path.join(self.directory, f"{name}.tmp-{pid}.npy")
+            np.save(staging, array)
+            os.replace(staging, os.path.join(self.directory, f"{name}.npy"))
+        staging = os.path.join(self.directory, f"counts.tmp-{pid}.npz")
+        sp.save_npz(staging, self.counts)
+        os.replace(staging, os.path.join(self.directory, "counts.npz"))
+        # state.json last: it is what marks the other files as consistent
+        staging = os.path.join(self.directory, f"state.tmp-{pid}.json")
+        with open(staging, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(staging, os.path.join(self.directory, "state.json"))
+
+    def row_hashes(self) -> List[str]:
+        hashes = [None] * len(self.rows)
+        for key, row in self.rows.items():
+            hashes[row] = key
+        return hashes
+
+    def fit(self, rows: Optional[np.ndarray] = None):
+        """
+        Fit the TF-IDF + NB pipeline on the cached counts of the given rows
+        (all rows by default), mirroring TfidfVectorizer.fit: features sorted
+        by name, pruned by max_df/min_df, capped at the max_features most
+        frequent, then IDF and NB fit on the TF-IDF matrix.
+        Returns (pipeline, columns) where columns maps each vocabulary index
+        of the fitted model back to a cache column.
+        """
+        from sklearn.base import clone
+        from sklearn.feature_extraction.text import TfidfTransformer
+
+        pipeline = clone(self.pipeline)
+        vectorizer = pipeline.named_steps['tfidf']
+        classifier = pipeline.named_steps['clf']
+
+        counts = self.counts if rows is None else self.counts[rows]
+        labels = np.array(self.labels) if rows is None else np.array(self.labels)[rows]
+
+        # Only n-grams present in these rows, in sorted order
+        document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+        present = [column for column in np.flatnonzero(document_frequency)]
+        present.sort(key=self.terms.__getitem__)
+        present = np.array(present, dtype=np.int64)
+        counts = counts[:, present]
+        document_frequency = document_frequency[present]
+
+        n_docs = counts.shape[0]
+        max_df, min_df = vectorizer.max_df, vectorizer.min_df
+        high = max_df if isinstance(max_df, (int, np.integer)) else max_df * n_docs
+        low = min_df if isinstance(min_df, (int, np.integer)) else min_df * n_docs
+        mask = (document_frequency <= high) & (document_frequency >= low)
+        limit = vectorizer.max_features
+        if limit is not None and mask.sum() > limit:
+            term_frequency = np.asarray(counts.sum(axis=0)).ravel()
+            mask_indices = (-term_frequency[mask]).argsort()[:limit]
+            limited = np.zeros(len(mask), dtype=bool)
+            limited[np.flatnonzero(mask)[mask_indices]] = True
+            mask = limited
+        kept = np.flatnonzero(mask)
+        if not len(kept):
+            raise ValueError("After pruning, no terms remain")
+
+        counts = counts[:, kept].astype(np.float64)
+        columns = present[kept]
+
+        transformer = TfidfTransformer(
+            norm=vectorizer.norm, use_idf=vectorizer.use_idf,
+            smooth_idf=vectorizer.smooth_idf, sublinear_tf=vectorizer.sublinear_tf
+        )
+        features = transformer.fit_transform(counts)
+        classifier.fit(features, labels)
+
+        vectorizer.vocabulary_ = {self.terms[column]: index for index, column in enumerate(columns)}
+        # What TfidfVectorizer.fit leaves behind for transform()
+        vectorizer._tfidf = transformer
+        return pipeline, columns
+
+    def predict(self, pipeline, columns: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Predict cached rows with a pipeline from fit(), without re-tokenizing them"""
+        vectorizer = pipeline.named_steps['tfidf']
+        counts = self.counts[rows][:, columns].astype(np.float64)
+        return pipeline.named_steps['clf'].predict(vectorizer._tfidf.transform(counts))
@@ -226,6 +226,31 @@ class TrainingData(Base):
     admin_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class ExplanationJob(Base):
+    """Queued LLM explanation for a checked message (async /check/message mode)"""
+    __tablename__ = "explanation_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    message_id = Column(UUID(as_uuid=True), ForeignKey("messages.id"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending, running, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    explanation_bn = Column(Text, nullable=True)  # messages has no Bangla column
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+class LLMResponseCache(Base):
+    """Persistent tier of the LLM response cache, shared by all workers"""
+    __tablename__ = "llm_response_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256(prompt version, model, normalized text)
+    prompt_version = Column(String(50), nullable=False, index=True)
+    model = Column(String(100), nullable=False)
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 # Dependency to get database session
 async def get_db():
     """Dependency for getting database session"""
@@ -0,0 +1,141 @@
+"""
+CheckBhai Executors - Keep CPU-bound work off the asyncio event loop
+Every scoring call goes through one lane:
+- inline: tiny inputs, cheaper to run than to hand off
+- thread: the default for request-sized work
+- process: large messages and batches when EXECUTOR_MODE=process
+- training: a single spawned process for model retraining
+Each lane reports in-flight and queued calls, wait time and run time under
+executor.<lane>.*
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from app.metrics import metrics
+
+# "inline" (never offload), "thread" or "process"
+EXECUTOR_MODE = os.getenv("EXECUTOR_MODE", "thread").lower()
+
+# Inputs up to this many characters run inline on the event loop
+EXECUTOR_INLINE_MAX_CHARS = int(os.getenv("EXECUTOR_INLINE_MAX_CHARS", "500"))
+
+# In process mode, inputs from this many characters go to the process pool
+EXECUTOR_PROCESS_MIN_CHARS = int(os.getenv("EXECUTOR_PROCESS_MIN_CHARS", "20000"))
+
+EXECUTOR_THREADS = int(os.getenv("EXECUTOR_THREADS", "4"))
+EXECUTOR_PROCESSES = int(os.getenv("EXECUTOR_PROCESSES", "2"))
+
+LANES = ("inline", "thread", "process", "training")
+
+
+def _timed_call(fn: Callable, args: tuple):
+    """Runs in the pool: report when work actually started (wall clock, so it works across processes)"""
+    return time.time(), fn(*args)
+
+
+class ScoringExecutor:
+    """Routes blocking calls to the right lane; pools are created on first use"""
+
+    def __init__(self, mode: str = EXECUTOR_MODE, inline_max_chars: int = EXECUTOR_INLINE_MAX_CHARS,
+                 process_min_chars: int = EXECUTOR_PROCESS_MIN_CHARS,
+                 threads: int = EXECUTOR_THREADS, processes: int = EXECUTOR_PROCESSES):
+        self.mode = mode
+        self.inline_max_chars = inline_max_chars
+        self.process_min_chars = process_min_chars
+        self.threads = threads
+        self.processes = processes
+        self._pools = {}
+        self._lane_metrics = {
+            lane: (
+                metrics.gauge(f"executor.{lane}.in_flight"),
+                metrics.gauge(f"executor.{lane}.queue_depth"),
+                metrics.histogram(f"executor.{lane}.wait_ms"),
+                metrics.histogram(f"executor.{lane}.run_ms"),
+                metrics.counter(f"executor.{lane}.tasks")
+            )
+            for lane in LANES
+        }
+
+    def lane_for(self, size: int) -> str:
+        """Pick a lane from the input size in characters"""
+        if self.mode == "inline" or size <= self.inline_max_chars:
+            return "inline"
+        if self.mode == "process" and size >= self.process_min_chars:
+            return "process"
+        return "thread"
+
+    def _workers(self, lane: str) -> int:
+        return {"thread": self.threads, "process": self.processes}.get(lane, 1)
+
+    def _pool(self, lane: str):
+        pool = self._pools.get(lane)
+        if pool is None:
+            if lane == "thread":
+                pool = ThreadPoolExecutor(max_workers=self._workers(lane), thread_name_prefix="scoring")
+            else:
+                # spawn, not fork: never copy the event loop or DB connections into a child
+                pool = ProcessPoolExecutor(
+                    max_workers=self._workers(lane),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            self._pools[lane] = pool
+        return pool
+
+    async def run(self, fn: Callable, *args, size: int = 0, lane: Optional[str] = None,
+                  allow_process: bool = True) -> Any:
+        """
+        Run fn(*args) on the lane chosen for size (or the given lane).
+        Process lanes need a picklable module-level fn and arguments; callers
+        with bound methods or closures pass allow_process=False.
+        """
+        lane = lane or self.lane_for(size)
+        if lane == "process" and not allow_process:
+            lane = "thread"
+        in_flight, queue_depth, wait_histogram, run_histogram, tasks = self._lane_metrics[lane]
+        tasks.inc()
+
+        if lane == "inline":
+            started = time.perf_counter()
+            result = fn(*args)
+            run_histogram.observe((time.perf_counter() - started) * 1000)
+            return result
+
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        in_flight.inc()
+        # Calls beyond the worker count wait in the pool's queue
+        queue_depth.set(max(0, in_flight.value - self._workers(lane)))
+        try:
+            started, result = await loop.run_in_executor(self._pool(lane), _timed_call, fn, args)
+        except BrokenProcessPool:
+            # A child died (OOM, killed); replace the pool for the next call
+            self._pools.pop(lane, None)
+            raise
+        finally:
+            in_flight.dec()
+            queue_depth.set(max(0, in_flight.value - self._workers(lane)))
+        finished = time.time()
+        wait_histogram.observe(max(0.0, started - submitted) * 1000)
+        run_histogram.observe(max(0.0, finished - started) * 1000)
+        return result
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools.clear()
+
+
+# Global executor shared by the check, batch, classifier and retrain paths
+_executor = None
+
+def get_executor() -> ScoringExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ScoringExecutor()
+    return _executor
@@ -0,0 +1,276 @@
+"""
+CheckBhai Explanation Jobs - LLM explanations filled in after the response
+In async mode /check/message answers with the rules result and a job id;
+a bounded pool of workers asks the LLM later and writes the explanation to
+the message row (GET /check/result/{message_id}).
+
+Jobs live in the explanation_jobs table, so a restart loses nothing: the
+sweeper re-queues pending jobs at startup and every sweep interval, and
+puts back jobs left 'running' by a worker that died. Any worker process may
+pick up any job; a conditional UPDATE claims it for exactly one of them.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+
+from app.database import AsyncSessionLocal, ExplanationJob, Message
+from app.llm_scheduler import PRIORITY_BACKGROUND
+from app.metrics import metrics
+from app.near_duplicate import get_near_duplicate_index
+
+# Concurrent LLM explanation calls per worker process
+EXPLANATION_WORKERS = int(os.getenv("EXPLANATION_WORKERS", "4"))
+
+# Jobs waiting per worker process; when full, async requests get no job (backpressure)
+EXPLANATION_QUEUE_SIZE = int(os.getenv("EXPLANATION_QUEUE_SIZE", "500"))
+
+# Seconds one job may take, LLM call included
+EXPLANATION_JOB_TIMEOUT = float(os.getenv("EXPLANATION_JOB_TIMEOUT", "30"))
+
+# A job that failed this many times stays failed (the local explanation remains)
+EXPLANATION_MAX_ATTEMPTS = int(os.getenv("EXPLANATION_MAX_ATTEMPTS", "3"))
+
+# Seconds between sweeps for pending, retryable and abandoned jobs
+EXPLANATION_SWEEP_INTERVAL = float(os.getenv("EXPLANATION_SWEEP_INTERVAL", "30"))
+
+
+class ExplanationJobQueue:
+    """Per-process worker pool over the shared explanation_jobs table"""
+
+    def __init__(self, workers: int = EXPLANATION_WORKERS, maxsize: int = EXPLANATION_QUEUE_SIZE,
+                 timeout: float = EXPLANATION_JOB_TIMEOUT, max_attempts: int = EXPLANATION_MAX_ATTEMPTS,
+                 sweep_interval: float = EXPLANATION_SWEEP_INTERVAL):
+        self.workers = max(1, workers)
+        self.maxsize = max(1, maxsize)
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.sweep_interval = sweep_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[uuid.UUID] = set()
+        self._tasks: List[asyncio.Task] = []
+
+        self._depth = metrics.gauge("explanations.queue_depth")
+        self._busy = metrics.gauge("explanations.busy_workers")
+        self._submitted = metrics.counter("explanations.submitted")
+        self._rejected = metrics.counter("explanations.rejected")
+        self._requeued = metrics.counter("explanations.requeued")
+        self._completed = metrics.counter("explanations.completed")
+        self._retried = metrics.counter("explanations.retried")
+        self._failed = metrics.counter("explanations.failed")
+        self._timeouts = metrics.counter("explanations.timeouts")
+        self._wait_ms = metrics.histogram("explanations.wait_ms")
+        self._run_ms = metrics.histogram("explanations.run_ms")
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    async def start(self):
+        """Start the workers and the sweeper (which re-queues pending jobs right away)"""
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep_loop()))
+
+    async def stop(self):
+        """Cancel the workers; jobs they held are re-queued by the next process's sweep"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._queued.clear()
+
+    async def submit(self, message_id: str) -> Optional[str]:
+        """
+        Persist and queue an explanation job for a saved message.
+        Returns the job id, or None when the queue is full or not running.
+        """
+        if not self.running or self._queue.full():
+            self._rejected.inc()
+            return None
+        async with AsyncSessionLocal() as db:
+            job = ExplanationJob(message_id=uuid.UUID(str(message_id)))
+            db.add(job)
+            await db.commit()
+            job_id = job.id
+        self._submitted.inc()
+        if not self._enqueue(job_id):
+            # Filled up meanwhile: the row stays pending for the sweeper
+            self._rejected.inc()
+        return str(job_id)
+
+    def _enqueue(self, job_id: uuid.UUID) -> bool:
+        if job_id in self._queued:
+            return True
+        try:
+            self._queue.put_nowait((job_id, time.monotonic()))
+        except asyncio.QueueFull:
+            return False
+        self._queued.add(job_id)
+        self._depth.set(self._queue.qsize())
+        return True
+
+    async def _worker(self):
+        while True:
+            job_id, enqueued_at = await self._queue.get()
+            self._queued.discard(job_id)
+            self._depth.set(self._queue.qsize())
+            self._wait_ms.observe((time.monotonic() - enqueued_at) * 1000)
+            self._busy.inc()
+            started = time.perf_counter()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Explanation job {job_id} crashed: {e}")
+            finally:
+                self._busy.dec()
+                self._run_ms.observe((time.perf_counter() - started) * 1000)
+                self._queue.task_done()
+
+    async def _claim(self, job_id: uuid.UUID) -> Optional[Tuple[int, Message]]:
+        """Move a pending job to running; None if another worker got it first"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(ExplanationJob)
+                .where(ExplanationJob.id == job_id, ExplanationJob.status == "pending")
+                .values(status="running", started_at=datetime.utcnow(), attempts=ExplanationJob.attempts + 1)
+            )
+            await db.commit()
+            if result.rowcount != 1:
+                return None
+            job = await db.get(ExplanationJob, job_id)
+            message = await db.get(Message, job.message_id)
+            return job.attempts, message
+
+    async def _run(self, job_id: uuid.UUID):
+        from app.services.ai_service import get_ai_service
+
+        claimed = await self._claim(job_id)
+        if claimed is None:
+            return
+        attempts, message = claimed
+        if message is None:
+            await self._finish(job_id, "failed", error="message deleted")
+            self._failed.inc()
+            return
+
+        try:
+            # Lowest priority: interactive requests are served first; a shed job is retried
+            ai_result = await asyncio.wait_for(
+                get_ai_service().analyze_message(message.message_text, priority=PRIORITY_BACKGROUND),
+                timeout=self.timeout
+            )
+            if ai_result.get("provider") == "fallback":
+                raise RuntimeError(f"LLM unavailable ({ai_result.get('fallback_reason', 'unavailable')})")
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self._timeouts.inc()
+                e = RuntimeError(f"timed out after {self.timeout}s")
+            if attempts < self.max_attempts:
+                # Back to pending: the next sweep retries it
+                await self._finish(job_id, "pending", error=str(e))
+                self._retried.inc()
+            else:
+                await self._finish(job_id, "failed", error=str(e))
+                self._failed.inc()
+            return
+
+        red_flags = list(set(ai_result.get("red_flags", []) + (message.red_flags or [])))
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Message)
+                .where(Message.id == message.id)
+                .values(explanation=ai_result.get("explanation_en", message.explanation), red_flags=red_flags)
+            )
+            await db.commit()
+        await self._finish(job_id, "done", explanation_bn=ai_result.get("explanation_bn"))
+        self._completed.inc()
+        # The row's flags are still the rules' own: the job ran before any LLM flags were added
+        get_near_duplicate_index().add(message.message_text, ai_result, message.risk_level, message.red_flags or [])
+
+    async def _finish(self, job_id: uuid.UUID, status: str, error: Optional[str] = None,
+                      explanation_bn: Optional[str] = None):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(ExplanationJob)
+                .where(ExplanationJob.id == job_id)
+                .values(status=status, error=error, explanation_bn=explanation_bn,
+                        finished_at=datetime.utcnow() if status in ("done", "failed") else None)
+            )
+            await db.commit()
+
+    async def sweep(self) -> int:
+        """Reset abandoned running jobs and queue pending ones; returns how many were queued"""
+        abandoned_before = datetime.utcnow() - timedelta(seconds=self.timeout * 2)
+        async with AsyncSessionLocal() as db:
+            # 'running' long past the job timeout: its worker process died
+            await db.execute(
+                update(ExplanationJob)
+                .where(ExplanationJob.status == "running", ExplanationJob.started_at < abandoned_before)
+                .values(status="pending")
+            )
+            await db.commit()
+            free = self.maxsize - self._queue.qsize()
+            if free <= 0:
+                return 0
+            result = await db.execute(
+                select(ExplanationJob.id)
+                .filter(ExplanationJob.status == "pending")
+                .order_by(ExplanationJob.created_at)
+                .limit(free)
+            )
+            job_ids = [row.id for row in result]
+        queued = 0
+        for job_id in job_ids:
+            if job_id not in self._queued and self._enqueue(job_id):
+                queued += 1
+        self._requeued.inc(queued)
+        return queued
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                queued = await self.sweep()
+                if queued:
+                    print(f"Re-queued {queued} pending explanation jobs")
+            except Exception as e:
+                print(f"Explanation job sweep failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def job_for_message(self, message_id: uuid.UUID) -> Optional[ExplanationJob]:
+        """Most recent job of a message"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ExplanationJob)
+                .filter(ExplanationJob.message_id == message_id)
+                .order_by(ExplanationJob.created_at.desc())
+                .limit(1)
+            )
+            return result.scalar_one_or_none()
+
+    def stats(self) -> Dict:
+        """Queue depth and job outcomes (this worker process)"""
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "queue_size": self.maxsize,
+            **metrics.snapshot("explanations")
+        }
+
+
+# Global job queue (started by the app lifespan)
+_explanation_queue = None
+
+def get_explanation_queue() -> ExplanationJobQueue:
+    global _explanation_queue
+    if _explanation_queue is None:
+        _explanation_queue = ExplanationJobQueue()
+    return _explanation_queue
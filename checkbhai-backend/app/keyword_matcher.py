@@ -0,0 +1,267 @@
+"""
+CheckBhai Keyword Matcher - Multi-pattern keyword search
+Two matchers with the same interface:
+- TokenMatcher: one tokenization pass plus a token/phrase trie (whole words,
+  multi-word keys, English and Bangla inflection suffixes). Used by default.
+- KeywordMatcher: Aho-Corasick automaton for raw substring matching.
+Both scan a message once, regardless of how many keywords are configured.
+"""
+
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Set, Tuple
+
+# Words and numbers (optionally ending in %) in ASCII/Latin or Bangla script.
+# Kept to one character class: the regex scan dominates tokenization cost.
+TOKEN_PATTERN = re.compile(r'[0-9a-z\u00c0-\u024f\u0980-\u09ff]+%?')
+
+# Common Bangla inflections, so "টাকা" also matches "টাকার" and "বিকাশে"
+BANGLA_SUFFIXES = tuple(unicodedata.normalize('NFC', suffix) for suffix in (
+    'গুলো', 'গুলি', 'দের', 'এর', 'ের', 'কে', 'তে', 'টি', 'টা', 'রা', 'র', 'ে', 'ই', 'ও', 'য়'
+))
+
+# Common English inflections, as (suffix, replacements): "verify" also matches
+# "verified"/"verification", "click" matches "clicking"/"clicked", "share"
+# matches "sharing". Stems shorter than MIN_ENGLISH_STEM are not tried.
+ENGLISH_SUFFIXES = (
+    ('ications', ('y',)), ('ication', ('y',)), ('ations', ('', 'e')), ('ation', ('', 'e')),
+    ('ies', ('y',)), ('ied', ('y',)), ('ing', ('', 'e')), ('ed', ('', 'e')), ('es', ('', 'e')), ('s', ('',)),
+)
+MIN_ENGLISH_STEM = 3
+
+
+class KeywordHit(NamedTuple):
+    """A single keyword occurrence in the scanned text"""
+    start: int
+    end: int
+    keyword: str
+    category: str
+    language: str
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over (keyword, category, language) entries.
+    Matching is plain substring matching on the text it is given, so callers
+    should lowercase the text exactly as the keywords are stored.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str]]):
+        # Trie construction: state 0 is the root
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[Tuple[str, str, str]]] = [[]]
+        keywords = set()
+
+        for keyword, category, language in entries:
+            if not keyword:
+                continue
+            keywords.add(keyword)
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            entry = (keyword, category, language)
+            if entry not in outputs[state]:
+                outputs[state].append(entry)
+
+        # Failure links + full transition table (BFS), so the scan loop never
+        # has to walk failure chains.
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            fallback = fail[state]
+            outputs[state].extend(outputs[fallback])
+            transitions = dict(delta[fallback])
+            for char, child in goto[state].items():
+                fail[child] = delta[fallback].get(char, 0)
+                transitions[char] = child
+                queue.append(child)
+            delta[state] = transitions
+
+        self._delta = delta
+        self._outputs = [tuple(out) for out in outputs]
+        self._categories: List[FrozenSet[str]] = [
+            frozenset(category for _, category, _ in out) for out in outputs
+        ]
+        self._keyword_count = len(keywords)
+
+    @classmethod
+    def from_keyword_dicts(cls, keyword_dicts: Dict[str, Dict[str, List[str]]]) -> "KeywordMatcher":
+        """Build from {category: {language: [keywords]}}"""
+        return cls(
+            (keyword, category, language)
+            for category, languages in keyword_dicts.items()
+            for language, keywords in languages.items()
+            for keyword in keywords
+        )
+
+    def __len__(self) -> int:
+        return self._keyword_count
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        """Return every (possibly overlapping) keyword hit in one pass"""
+        hits = []
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for index, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                end = index + 1
+                for keyword, category, language in outputs[state]:
+                    hits.append(KeywordHit(end - len(keyword), end, keyword, category, language))
+        return hits
+
+    def categories(self, text: str) -> Set[str]:
+        """Return the set of categories with at least one hit"""
+        found: Set[str] = set()
+        delta = self._delta
+        categories = self._categories
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if categories[state]:
+                found.update(categories[state])
+        return found
+
+
+def tokenize(text: str) -> List[str]:
+    """Split (normalized, lowercase) text into word/number tokens"""
+    return TOKEN_PATTERN.findall(text)
+
+
+class _TokenSpans:
+    """
+    Lazily resolves character offsets of tokens, only for messages with hits.
+    Tokens are consecutive and separators never contain token characters, so
+    a forward str.find from the previous token's end lands on the token itself.
+    """
+
+    def __init__(self, text: str, tokens: List[str]):
+        self.text = text
+        self.tokens = tokens
+        self.starts: List[int] = []
+
+    def start(self, index: int) -> int:
+        starts = self.starts
+        while len(starts) <= index:
+            k = len(starts)
+            position = starts[-1] + len(self.tokens[k - 1]) if starts else 0
+            starts.append(self.text.find(self.tokens[k], position))
+        return starts[index]
+
+    def end(self, index: int) -> int:
+        return self.start(index) + len(self.tokens[index])
+
+
+def _is_bangla(token: str) -> bool:
+    return '\u0980' <= token[0] <= '\u09ff'
+
+
+@lru_cache(maxsize=8192)
+def _token_forms(token: str) -> Tuple[str, ...]:
+    """The token itself plus its stems with one known inflection suffix removed"""
+    forms = [token]
+    if _is_bangla(token):
+        for suffix in BANGLA_SUFFIXES:
+            if len(token) > len(suffix) and token.endswith(suffix):
+                forms.append(token[:-len(suffix)])
+    elif token.isalpha():
+        for suffix, replacements in ENGLISH_SUFFIXES:
+            if not token.endswith(suffix):
+                continue
+            stem = token[:-len(suffix)]
+            if len(stem) < MIN_ENGLISH_STEM:
+                continue
+            for replacement in replacements:
+                forms.append(stem + replacement)
+            # Doubled final consonant: "winning" -> "win", "stopped" -> "stop"
+            if suffix in ('ing', 'ed') and stem[-1] == stem[-2] and stem[-1] not in 'aeiouls':
+                forms.append(stem[:-1])
+    return tuple(dict.fromkeys(forms))
+
+
+class TokenMatcher:
+    """
+    Trie over keyword token sequences. Keywords match whole tokens only
+    ('now' does not fire inside 'know'), or their inflected forms ('verify'
+    fires on 'verified'); multi-word keys such as 'within 24 hours' match
+    consecutive tokens.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str]]):
+        # Each node: (children {token: node}, outputs [(keyword, category, language)])
+        self._root: Tuple[Dict, List] = ({}, [])
+        keywords = set()
+
+        for keyword, category, language in entries:
+            tokens = tokenize(keyword)
+            if not tokens:
+                continue
+            keywords.add(keyword)
+            node = self._root
+            for token in tokens:
+                node = node[0].setdefault(token, ({}, []))
+            entry = (keyword, category, language)
+            if entry not in node[1]:
+                node[1].append(entry)
+
+        self._keyword_count = len(keywords)
+
+    @classmethod
+    def from_keyword_dicts(cls, keyword_dicts: Dict[str, Dict[str, List[str]]]) -> "TokenMatcher":
+        """Build from {category: {language: [keywords]}}"""
+        return cls(
+            (keyword, category, language)
+            for category, languages in keyword_dicts.items()
+            for language, keywords in languages.items()
+            for keyword in keywords
+        )
+
+    def __len__(self) -> int:
+        return self._keyword_count
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        """Return every keyword/phrase hit, with character spans, in one pass"""
+        tokens = tokenize(text)
+        root_children = self._root[0]
+        hits = []
+        spans = None
+
+        for index, token in enumerate(tokens):
+            # Fast path: a plain dict probe; only inflected words need stem forms
+            if token not in root_children and len(_token_forms(token)) == 1:
+                continue
+            for form in _token_forms(token):
+                node = root_children.get(form)
+                if node is not None:
+                    if spans is None:
+                        spans = _TokenSpans(text, tokens)
+                    self._walk(node, index, index, tokens, spans, hits)
+        return hits
+
+    def _walk(self, node, start: int, position: int, tokens: List[str],
+              spans: _TokenSpans, hits: List[KeywordHit]):
+        """Emit the keywords ending at this node, then extend the phrase by one token"""
+        for keyword, category, language in node[1]:
+            hits.append(KeywordHit(spans.start(start), spans.end(position), keyword, category, language))
+        children = node[0]
+        if children and position + 1 < len(tokens):
+            for form in _token_forms(tokens[position + 1]):
+                child = children.get(form)
+                if child is not None:
+                    self._walk(child, start, position + 1, tokens, spans, hits)
+
+    def categories(self, text: str) -> Set[str]:
+        """Return the set of categories with at least one hit"""
+        return {hit.category for hit in self.find_all(text)}
@@ -0,0 +1,215 @@
+"""
+CheckBhai LLM Cache - Two-tier cache for LLM message analyses
+Forwarded scam messages repeat thousands of times a day; each distinct
+message should cost one chain invocation. Entries are keyed by a hash of the
+prompt version, the model and the normalized message text:
+
+    memory      per-worker LRU with a short TTL, no I/O
+    persistent  llm_response_cache table (SQLite locally, Postgres in
+                production), shared by every worker
+
+A prompt change bumps the prompt version, so old entries simply stop
+matching; DELETE /admin/llm-cache purges them from the table.
+"""
+
+import copy
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.database import AsyncSessionLocal, LLMResponseCache
+from app.metrics import metrics
+from app.text_normalizer import normalize_text
+
+logger = logging.getLogger("LLMCache")
+
+# Cached analyses kept in each worker's memory tier (0 disables it)
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", "1024"))
+
+# Seconds a memory entry is served before the persistent tier is asked again.
+# Also bounds how long other workers keep serving an entry after an admin purge.
+LLM_CACHE_MEMORY_TTL = float(os.getenv("LLM_CACHE_MEMORY_TTL", "300"))
+
+# Seconds a persistent entry stays valid
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Use the database tier (false: memory only)
+LLM_CACHE_PERSISTENT = os.getenv("LLM_CACHE_PERSISTENT", "true").lower() == "true"
+
+
+def cache_key(text: str, prompt_version: str, model: str) -> str:
+    """Same key for every message that normalizes to the same text"""
+    payload = "\x00".join((prompt_version, model, normalize_text(text)))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCacheStore:
+    """Memory LRU in front of the shared llm_response_cache table"""
+
+    def __init__(self, prompt_version: str, model: str, memory_size: int = LLM_CACHE_MEMORY_SIZE,
+                 memory_ttl: float = LLM_CACHE_MEMORY_TTL, ttl: float = LLM_CACHE_TTL,
+                 persistent: bool = LLM_CACHE_PERSISTENT):
+        self.prompt_version = prompt_version
+        self.model = model
+        self.memory_size = memory_size
+        self.memory_ttl = memory_ttl
+        self.ttl = ttl
+        self.persistent = persistent
+        # key -> (monotonic expiry, response)
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._memory_hits = metrics.counter("llm_cache.memory.hits")
+        self._persistent_hits = metrics.counter("llm_cache.persistent.hits")
+        self._misses = metrics.counter("llm_cache.misses")
+        self._stores = metrics.counter("llm_cache.stores")
+        self._evictions = metrics.counter("llm_cache.memory.evictions")
+        self._errors = metrics.counter("llm_cache.persistent.errors")
+        self._memory_entries = metrics.gauge("llm_cache.memory.entries")
+        self._persistent_ms = metrics.histogram("llm_cache.persistent.lookup_ms")
+
+    def key(self, text: str) -> str:
+        return cache_key(text, self.prompt_version, self.model)
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """Cached analysis for key, or None. Callers get their own copy."""
+        response = self._memory_get(key)
+        if response is not None:
+            self._memory_hits.inc()
+            return copy.deepcopy(response)
+
+        if self.persistent:
+            started = time.perf_counter()
+            row = await self._persistent_get(key)
+            self._persistent_ms.observe((time.perf_counter() - started) * 1000)
+            if row is not None:
+                response, expires_at = row
+                self._persistent_hits.inc()
+                remaining = (expires_at - datetime.utcnow()).total_seconds()
+                self._memory_set(key, response, min(self.memory_ttl, remaining))
+                return copy.deepcopy(response)
+
+        self._misses.inc()
+        return None
+
+    async def set(self, key: str, response: Dict):
+        """Store a successful analysis in both tiers"""
+        response = copy.deepcopy(response)
+        self._stores.inc()
+        self._memory_set(key, response, self.memory_ttl)
+        if self.persistent:
+            await self._persistent_set(key, response)
+
+    def _memory_get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires, response = entry
+            if expires <= time.monotonic():
+                del self._memory[key]
+                self._memory_entries.set(len(self._memory))
+                return None
+            self._memory.move_to_end(key)
+            return response
+
+    def _memory_set(self, key: str, response: Dict, ttl: float):
+        if self.memory_size <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._memory[key] = (time.monotonic() + ttl, response)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+                self._evictions.inc()
+            self._memory_entries.set(len(self._memory))
+
+    async def _persistent_get(self, key: str) -> Optional[Tuple[Dict, datetime]]:
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(LLMResponseCache.response, LLMResponseCache.expires_at)
+                    .filter(LLMResponseCache.key == key, LLMResponseCache.expires_at > datetime.utcnow())
+                )
+                row = result.first()
+        except Exception as e:
+            # A cache outage must never fail the analysis: treat it as a miss
+            self._errors.inc()
+            logger.warning(f"LLM cache lookup failed: {e}")
+            return None
+        return (row.response, row.expires_at) if row else None
+
+    async def _persistent_set(self, key: str, response: Dict):
+        now = datetime.utcnow()
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.merge(LLMResponseCache(
+                    key=key,
+                    prompt_version=self.prompt_version,
+                    model=self.model,
+                    response=response,
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl)
+                ))
+                await db.commit()
+        except IntegrityError:
+            pass  # another worker stored the same analysis first
+        except Exception as e:
+            self._errors.inc()
+            logger.warning(f"LLM cache store failed: {e}")
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_entries.set(0)
+
+    async def invalidate(self, prompt_version: Optional[str] = None) -> int:
+        """
+        Drop cached analyses: those of one prompt version, or all of them.
+        Expired rows go too. Returns the number of table rows deleted.
+        """
+        self.clear_memory()
+        query = delete(LLMResponseCache)
+        if prompt_version:
+            query = query.where(
+                (LLMResponseCache.prompt_version == prompt_version) |
+                (LLMResponseCache.expires_at <= datetime.utcnow())
+            )
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(query)
+            await db.commit()
+        return result.rowcount or 0
+
+    async def stats(self) -> Dict:
+        """Hit/miss counters for this worker plus table size per prompt version"""
+        snapshot = metrics.snapshot("llm_cache")
+        counters = snapshot["counters"]
+        hits = counters.get("llm_cache.memory.hits", 0) + counters.get("llm_cache.persistent.hits", 0)
+        lookups = hits + counters.get("llm_cache.misses", 0)
+        persistent_entries = None
+        if self.persistent:
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        select(LLMResponseCache.prompt_version, func.count())
+                        .group_by(LLMResponseCache.prompt_version)
+                    )
+                    persistent_entries = {version: count for version, count in result.all()}
+            except Exception as e:
+                logger.warning(f"LLM cache stats failed: {e}")
+        return {
+            "prompt_version": self.prompt_version,
+            "model": self.model,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "memory_entries": len(self._memory),
+            "persistent_entries": persistent_entries,
+            **snapshot
+        }
@@ -0,0 +1,130 @@
+"""
+CheckBhai LLM Clients - One pooled HTTP connection layer for every LLM call
+The OpenAI client used by AIEngine and the ChatOpenAI model behind the
+LangChain service share a single httpx.AsyncClient, so TLS connections to
+the provider are kept alive and reused instead of each client (and each
+retrained engine) opening its own pool. The app lifespan closes it on
+shutdown. Requests are counted under llm.http.*.
+"""
+
+import os
+from typing import Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.metrics import metrics
+
+# Connections to the LLM provider per worker, and how many idle ones are kept alive
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10"))
+
+# Seconds an idle keep-alive connection is kept before it is closed
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# Seconds to connect, and to read/write/wait for a pooled connection
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "30"))
+
+
+class LLMClients:
+    """
+    Lazily built clients over one connection pool. The pool belongs to the
+    event loop that first sends a request through it (the app's loop; see
+    app.loop_bridge for sync callers).
+    """
+
+    def __init__(self, api_key: Optional[str] = None, max_connections: int = LLM_HTTP_MAX_CONNECTIONS,
+                 max_keepalive: int = LLM_HTTP_MAX_KEEPALIVE, keepalive_expiry: float = LLM_HTTP_KEEPALIVE_EXPIRY,
+                 connect_timeout: float = LLM_HTTP_CONNECT_TIMEOUT, timeout: float = LLM_HTTP_TIMEOUT):
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.max_connections = max(1, max_connections)
+        self.max_keepalive = max(0, min(max_keepalive, self.max_connections))
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self._http: Optional[httpx.AsyncClient] = None
+        self._openai: Optional[AsyncOpenAI] = None
+
+        self._requests = metrics.counter("llm.http.requests")
+        self._errors = metrics.counter("llm.http.errors")
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def request_timeout(self) -> httpx.Timeout:
+        """
+        Timeouts for every LLM request. Passed to the OpenAI clients too:
+        their per-request timeout would otherwise override the pool's.
+        """
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """The shared pooled HTTP client"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                timeout=self.request_timeout,
+                event_hooks={"request": [self._on_request], "response": [self._on_response]}
+            )
+        return self._http
+
+    @property
+    def openai(self) -> Optional[AsyncOpenAI]:
+        """Shared OpenAI client (None without an API key)"""
+        if not self.available:
+            return None
+        if self._openai is None:
+            self._openai = AsyncOpenAI(api_key=self.api_key, http_client=self.http, timeout=self.request_timeout)
+        return self._openai
+
+    def chat_model(self, **kwargs):
+        """ChatOpenAI on the shared pool (None without an API key)"""
+        if not self.available:
+            return None
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(api_key=self.api_key, http_async_client=self.http, timeout=self.request_timeout, **kwargs)
+
+    async def _on_request(self, request: httpx.Request):
+        self._requests.inc()
+
+    async def _on_response(self, response: httpx.Response):
+        metrics.counter(f"llm.http.status.{response.status_code}").inc()
+        if response.status_code >= 500 or response.status_code == 429:
+            self._errors.inc()
+
+    async def aclose(self):
+        """Close pooled connections (app shutdown)"""
+        if self._http is not None and not self._http.is_closed:
+            await self._http.aclose()
+        self._http = None
+        self._openai = None
+
+    def stats(self) -> Dict:
+        return {
+            "available": self.available,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_expiry_seconds": self.keepalive_expiry,
+            "connect_timeout_seconds": self.connect_timeout,
+            "timeout_seconds": self.timeout,
+            "open": self._http is not None and not self._http.is_closed,
+            **metrics.snapshot("llm.http")
+        }
+
+
+# Global clients (closed by the app lifespan)
+_llm_clients = None
+
+def get_llm_clients() -> LLMClients:
+    global _llm_clients
+    if _llm_clients is None:
+        _llm_clients = LLMClients()
+    return _llm_clients
@@ -0,0 +1,215 @@
+"""
+CheckBhai LLM Scheduler - Admission control for LLM calls
+Every chain call takes a slot first:
+- at most max_concurrency calls in flight per worker
+- a token bucket caps the call rate (rate per second, burst)
+- waiting calls are served by priority: paying users, then signed-in users,
+  then anonymous traffic, then background jobs; FIFO within a priority
+- a call still waiting after its queue timeout is shed: the caller gets the
+  rules-only fallback instead of adding to a provider backlog
+Reported under llm.scheduler.*: queue depth, in flight, wait time, shed.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Payment, User
+from app.metrics import metrics
+
+# Concurrent chain calls per worker process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Token bucket: sustained chain calls per second per worker (0 disables) and burst size
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "5"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "10"))
+
+# Seconds a call may wait for a slot before it is shed to the fallback
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "3"))
+
+# Seconds a user's premium status is remembered, and for how many users per worker
+PREMIUM_STATUS_TTL = float(os.getenv("PREMIUM_STATUS_TTL", "60"))
+PREMIUM_STATUS_CACHE_SIZE = int(os.getenv("PREMIUM_STATUS_CACHE_SIZE", "10000"))
+
+# Lower is served first
+PRIORITY_PREMIUM = 0
+PRIORITY_USER = 1
+PRIORITY_ANONYMOUS = 2
+PRIORITY_BACKGROUND = 3
+PRIORITY_NAMES = {
+    PRIORITY_PREMIUM: "premium",
+    PRIORITY_USER: "user",
+    PRIORITY_ANONYMOUS: "anonymous",
+    PRIORITY_BACKGROUND: "background"
+}
+
+
+class LLMShedError(Exception):
+    """A call waited longer than its queue timeout and was dropped"""
+
+
+class LLMScheduler:
+    """
+    Priority queue in front of the LLM, bound to the event loop that first
+    uses it. Calls from any other loop cannot share its futures; they run
+    unscheduled and are counted as such.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, rate: float = LLM_RATE_PER_SECOND,
+                 burst: int = LLM_RATE_BURST, queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+                 name: str = "llm.scheduler"):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.queue_timeout = queue_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self._depth = metrics.gauge(f"{name}.queue_depth")
+        self._in_flight_gauge = metrics.gauge(f"{name}.in_flight")
+        self._granted = metrics.counter(f"{name}.granted")
+        self._unscheduled = metrics.counter(f"{name}.unscheduled")
+        self._wait_ms = {
+            priority: metrics.histogram(f"{name}.wait_ms.{label}") for priority, label in PRIORITY_NAMES.items()
+        }
+        self._shed = {
+            priority: metrics.counter(f"{name}.shed.{label}") for priority, label in PRIORITY_NAMES.items()
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_ANONYMOUS, timeout: Optional[float] = None):
+        """Hold one LLM slot for the body; raises LLMShedError if none frees up in time"""
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        if loop is not self._loop:
+            self._unscheduled.inc()
+            yield
+            return
+
+        await self._acquire(priority, self.queue_timeout if timeout is None else timeout)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int, timeout: float):
+        started = time.perf_counter()
+        future = self._loop.create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), future))
+        self._dispatch()
+        shed_timer = self._loop.call_later(timeout, self._shed_waiter, future, priority)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # granted just as the caller went away
+            raise
+        finally:
+            shed_timer.cancel()
+            self._depth.set(self._pending())
+        self._wait_ms[priority].observe((time.perf_counter() - started) * 1000)
+
+    def _shed_waiter(self, future: asyncio.Future, priority: int):
+        if not future.done():
+            self._shed[priority].inc()
+            future.set_exception(LLMShedError(f"no LLM slot within the queue timeout ({PRIORITY_NAMES[priority]})"))
+
+    def _release(self):
+        self._in_flight -= 1
+        self._in_flight_gauge.set(self._in_flight)
+        self._dispatch()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _dispatch(self):
+        """Grant slots to the best waiting calls while concurrency and tokens allow"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.rate > 0:
+            self._refill()
+        while self._waiting and self._in_flight < self.max_concurrency:
+            future = self._waiting[0][2]
+            if future.done():
+                heapq.heappop(self._waiting)  # shed or cancelled
+                continue
+            if self.rate > 0 and self._tokens < 1:
+                if self._timer is None:
+                    self._timer = self._loop.call_later((1 - self._tokens) / self.rate, self._dispatch)
+                break
+            heapq.heappop(self._waiting)
+            if self.rate > 0:
+                self._tokens -= 1
+            self._in_flight += 1
+            self._granted.inc()
+            future.set_result(None)
+        self._in_flight_gauge.set(self._in_flight)
+        self._depth.set(self._pending())
+
+    def _pending(self) -> int:
+        return sum(1 for _, _, future in self._waiting if not future.done())
+
+    def stats(self) -> Dict:
+        snapshot = metrics.snapshot("llm.scheduler")
+        return {
+            "max_concurrency": self.max_concurrency,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "queue_timeout_seconds": self.queue_timeout,
+            "in_flight": self._in_flight,
+            "queue_depth": self._pending(),
+            **snapshot
+        }
+
+
+# user id -> (monotonic expiry, premium), oldest first: with one TTL that is also
+# soonest-expiring first, so expired entries are dropped from the front on insert
+_premium_cache: "OrderedDict[str, Tuple[float, bool]]" = OrderedDict()
+
+
+def _remember_premium(key: str, premium: bool):
+    now = time.monotonic()
+    _premium_cache.pop(key, None)
+    while _premium_cache and next(iter(_premium_cache.values()))[0] <= now:
+        _premium_cache.popitem(last=False)
+    _premium_cache[key] = (now + PREMIUM_STATUS_TTL, premium)
+    while len(_premium_cache) > max(1, PREMIUM_STATUS_CACHE_SIZE):
+        _premium_cache.popitem(last=False)
+
+
+async def llm_priority(db: AsyncSession, user: Optional[User]) -> int:
+    """Scheduling priority of a request: premium (completed payment), signed in, or anonymous"""
+    if user is None:
+        return PRIORITY_ANONYMOUS
+    key = str(user.id)
+    cached = _premium_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        premium = cached[1]
+    else:
+        try:
+            result = await db.execute(
+                select(Payment.id).filter(Payment.user_id == user.id, Payment.status == "completed").limit(1)
+            )
+            premium = result.first() is not None
+        except Exception as e:
+            print(f"Premium status lookup failed (non-critical): {e}")
+            return PRIORITY_USER
+        _remember_premium(key, premium)
+    return PRIORITY_PREMIUM if premium else PRIORITY_USER
@@ -0,0 +1,85 @@
+"""
+CheckBhai Loop Bridge - Run async service calls from synchronous code
+Sync callers (analyze_sync, scripts) hand their coroutine to a long-lived
+event loop instead of building a new loop and thread pool per call:
+- while the app is running, the app's own loop (attached by the lifespan),
+  so the call shares its LLM connection pool, scheduler and coalescing
+- otherwise, one background loop thread started on first use
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, Optional
+
+from app.metrics import metrics
+
+
+class LoopBridge:
+    """Thread-safe: any number of sync callers may share it"""
+
+    def __init__(self, name: str = "loop-bridge"):
+        self.name = name
+        self._attached: Optional[asyncio.AbstractEventLoop] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._calls = metrics.counter("loop_bridge.calls")
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Send sync calls to the app's loop from now on"""
+        self._attached = loop
+
+    def detach(self):
+        self._attached = None
+
+    def _target(self) -> asyncio.AbstractEventLoop:
+        if self._attached is not None and self._attached.is_running():
+            return self._attached
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run coro on the bridge loop and wait for its result from this thread"""
+        loop = self._target()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("Sync call from inside the event loop it needs would block it; await the coroutine instead")
+
+        self._calls.inc()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self):
+        """Stop the background loop thread, if one was started"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not loop.is_running():
+            loop.close()
+
+
+# Global bridge (attached to the app loop by the lifespan)
+_loop_bridge = None
+
+def get_loop_bridge() -> LoopBridge:
+    global _loop_bridge
+    if _loop_bridge is None:
+        _loop_bridge = LoopBridge()
+    return _loop_bridge
@@ -6,11 +6,12 @@ from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import os
 
 from app.database import init_db, create_admin_user, get_db
 from app.ai_engine import get_ai_engine
-from app.routers import auth, check, history, payment, admin, entities, reports, claims
+from app.routers import auth, check, history, payment, admin, entities, reports, claims, metrics
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -36,6 +37,28 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Admin user creation failed: {e}")
     
+    # Warm the shared rules engine (rule pack compiled once per worker)
+    rule_pack_watcher = None
+    try:
+        from app.rules_engine import get_rules_engine, watch_rule_pack, RULE_PACK_RELOAD_INTERVAL
+        rules_engine = get_rules_engine()
+        print(f"Rules engine ready. Rule pack version: {rules_engine.pack.version}")
+        if RULE_PACK_RELOAD_INTERVAL > 0:
+            rule_pack_watcher = asyncio.create_task(watch_rule_pack(rules_engine))
+    except Exception as e:
+        print(f"Rules engine initialization failed: {e}")
+    
+    # Shared LLM connection pool, and the bridge that runs sync LLM calls on this loop
+    llm_clients = None
+    try:
+        from app.llm_client import get_llm_clients
+        from app.loop_bridge import get_loop_bridge
+        llm_clients = get_llm_clients()
+        get_loop_bridge().attach(asyncio.get_running_loop())
+        print(f"LLM client pool ready ({llm_clients.max_connections} connections)")
+    except Exception as e:
+        print(f"LLM client initialization failed: {e}")
+    
     # Initialize AI service (Principles Aligned)
     try:
         from app.services.ai_service import get_ai_service
@@ -45,12 +68,42 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"AI Service initialization failed: {e}")
     
+    # Workers for async LLM explanations (re-queues jobs left pending by a restart)
+    explanation_queue = None
+    try:
+        from app.explanation_jobs import get_explanation_queue
+        explanation_queue = get_explanation_queue()
+        await explanation_queue.start()
+    except Exception as e:
+        print(f"Explanation job queue initialization failed: {e}")
+    
+    # Follow classifier versions published by background retraining
+    model_watcher = None
+    try:
+        from app.retraining import watch_current_model, MODEL_RELOAD_INTERVAL
+        if MODEL_RELOAD_INTERVAL > 0:
+            model_watcher = asyncio.create_task(watch_current_model())
+    except Exception as e:
+        print(f"Model watcher initialization failed: {e}")
+    
     print("CheckBhai Backend ready!")
     
     yield
     
     # Shutdown
     print("Shutting down CheckBhai Backend...")
+    if rule_pack_watcher:
+        rule_pack_watcher.cancel()
+    if model_watcher:
+        model_watcher.cancel()
+    if explanation_queue:
+        await explanation_queue.stop()
+    if llm_clients:
+        from app.loop_bridge import get_loop_bridge
+        get_loop_bridge().detach()
+        await llm_clients.aclose()
+    from app.executors import get_executor
+    get_executor().shutdown()
 
 # Create FastAPI application
 app = FastAPI(
@@ -84,6 +137,7 @@ app.include_router(admin.router)
 app.include_router(entities.router)
 app.include_router(reports.router)
 app.include_router(claims.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
@@ -99,6 +153,7 @@ async def root():
             "admin": "/admin",
             "entities": "/entities",
             "reports": "/reports",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -264,6 +319,7 @@ async def seed_db(db = Depends(get_db)):
 async def debug_ai():
     """Diagnose AI Service Connectivity (LangChain)"""
     from app.services.ai_service import get_ai_service
+    from app.llm_client import get_llm_clients
     import os
     
     ai_service = get_ai_service()
@@ -276,7 +332,11 @@ async def debug_ai():
             "LANGCHAIN_API_KEY_PRESENT": bool(os.getenv("LANGCHAIN_API_KEY"))
         },
         "ai_service_status": "Ready" if ai_service.is_available else "Initialization Failed or Missing Keys",
-        "tracing_status": "Enabled" if os.getenv("LANGCHAIN_TRACING_V2") == "true" else "Disabled"
+        "tracing_status": "Enabled" if os.getenv("LANGCHAIN_TRACING_V2") == "true" else "Disabled",
+        "single_flight": ai_service.single_flight.stats(),
+        "circuit_breaker": ai_service.breaker.snapshot(),
+        "scheduler": ai_service.scheduler.stats(),
+        "http_pool": get_llm_clients().stats()
     }
     
     if ai_service.is_available:
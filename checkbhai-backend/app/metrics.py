@@ -0,0 +1,151 @@
+"""
+CheckBhai Metrics - Lightweight in-process counters, gauges and histograms
+Cheap enough to leave on in production; exposed as JSON via /metrics.
+Values are per worker process.
+"""
+
+import bisect
+import threading
+from typing import Dict, Optional, Sequence, Union
+
+# Latency buckets in milliseconds (upper bounds)
+DEFAULT_LATENCY_BUCKETS_MS = (
+    0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000
+)
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Gauge:
+    """Value that goes up and down (queue depth, in-flight work)"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate percentiles"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+
+    def _percentile(self, counts, count: int, q: float) -> Optional[Union[float, str]]:
+        """Upper bound of the bucket holding the q-th percentile ("+Inf" past the last bucket)"""
+        if not count:
+            return None
+        target = q * count
+        running = 0
+        for index, bucket_count in enumerate(counts):
+            running += bucket_count
+            if running >= target:
+                return self.buckets[index] if index < len(self.buckets) else "+Inf"
+        return "+Inf"
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            count = self._count
+            total = self._sum
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+        return {
+            "count": count,
+            "sum": round(total, 4),
+            "mean": round(total / count, 4) if count else None,
+            "p50": self._percentile(counts, count, 0.5),
+            "p95": self._percentile(counts, count, 0.95),
+            "p99": self._percentile(counts, count, 0.99),
+            "buckets": cumulative
+        }
+
+
+class MetricsRegistry:
+    """Named metrics, created on first use"""
+
+    def __init__(self):
+        self._counters: Dict[str, Counter] = {}
+        self._gauges: Dict[str, Gauge] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str) -> Counter:
+        metric = self._counters.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._counters.setdefault(name, Counter())
+        return metric
+
+    def gauge(self, name: str) -> Gauge:
+        metric = self._gauges.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._gauges.setdefault(name, Gauge())
+        return metric
+
+    def histogram(self, name: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS) -> Histogram:
+        metric = self._histograms.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._histograms.setdefault(name, Histogram(buckets))
+        return metric
+
+    def snapshot(self, prefix: str = "") -> Dict:
+        """All metrics whose name starts with prefix"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items())
+        return {
+            "counters": {name: metric.value for name, metric in counters if name.startswith(prefix)},
+            "gauges": {name: metric.value for name, metric in gauges if name.startswith(prefix)},
+            "histograms": {name: metric.snapshot() for name, metric in histograms if name.startswith(prefix)}
+        }
+
+
+# Global registry shared by every module in the worker
+metrics = MetricsRegistry()
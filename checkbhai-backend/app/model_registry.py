@@ -0,0 +1,223 @@
+"""
+CheckBhai Model Registry - Versioned classifiers and shadow scoring
+Every retrain writes app/models/versions/<version>.pkl plus its artifact
+directory, whose meta.json carries training size, holdout metrics and fit
+time. Two pointer files decide what runs:
+
+    app/models/current.json   the live model every worker serves
+    app/models/shadow.json    an optional candidate scored in shadow mode
+
+In shadow mode the candidate scores a sample of /check/message traffic after
+the response is sent; disagreements with the live model are appended to
+app/models/shadow/<candidate>.jsonl for offline review.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.ai_engine import AIEngine, CURRENT_MODEL_POINTER, MODELS_DIR, get_ai_engine
+from app.metrics import metrics
+from app.rule_pack import file_stamp
+
+VERSIONS_DIR = os.path.join(MODELS_DIR, "versions")
+SHADOW_MODEL_POINTER = os.path.join(MODELS_DIR, "shadow.json")
+SHADOW_LOG_DIR = os.path.join(MODELS_DIR, "shadow")
+
+# Share of /check/message requests the shadow candidate scores (0 disables)
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+
+
+def _write_pointer(path: str, version: str):
+    """Atomically point workers at a registered version"""
+    pointer = {
+        "version": version,
+        "model_path": os.path.join(VERSIONS_DIR, f"{version}.pkl"),
+        "published_at": datetime.utcnow().isoformat()
+    }
+    staging = f"{path}.tmp-{os.getpid()}"
+    with open(staging, "w", encoding="utf-8") as f:
+        json.dump(pointer, f, indent=2)
+    os.replace(staging, path)
+
+
+def _read_pointer(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ModelRegistry:
+    """Read and manage the versions under app/models/versions/"""
+
+    def __init__(self, root: str = VERSIONS_DIR):
+        self.root = root
+
+    def list_versions(self) -> List[Dict]:
+        """Metadata of every registered version, newest first"""
+        if not os.path.isdir(self.root):
+            return []
+        versions = []
+        for name in sorted(os.listdir(self.root), reverse=True):
+            meta = self.get(name)
+            if meta:
+                versions.append(meta)
+        return versions
+
+    def get(self, version: str) -> Optional[Dict]:
+        meta_path = os.path.join(self.root, version, "meta.json")
+        if not os.path.isfile(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        return {
+            "version": version,
+            "training_size": meta.get("training_size"),
+            "metrics": meta.get("metrics"),
+            "fit_seconds": meta.get("fit_seconds"),
+            "n_features": meta.get("n_features"),
+            "created_at": datetime.utcfromtimestamp(os.path.getmtime(meta_path)).isoformat()
+        }
+
+    def exists(self, version: str) -> bool:
+        return self.get(version) is not None
+
+    @staticmethod
+    def new_version() -> str:
+        """
+        Fresh version id: UTC timestamp (so ids sort by age) plus a random
+        suffix, so two retrains in the same second never share an id
+        """
+        return f"{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+    def promote(self, version: str):
+        """Make a version live on every worker"""
+        if not self.exists(version):
+            raise ValueError(f"Unknown model version: {version}")
+        _write_pointer(CURRENT_MODEL_POINTER, version)
+
+    def set_shadow(self, version: str):
+        """Start scoring a version in shadow mode on every worker"""
+        if not self.exists(version):
+            raise ValueError(f"Unknown model version: {version}")
+        _write_pointer(SHADOW_MODEL_POINTER, version)
+
+    def clear_shadow(self):
+        if os.path.exists(SHADOW_MODEL_POINTER):
+            os.remove(SHADOW_MODEL_POINTER)
+
+    def shadow(self) -> Optional[Dict]:
+        return _read_pointer(SHADOW_MODEL_POINTER)
+
+
+class ShadowScorer:
+    """
+    Scores sampled messages with the live and the candidate model and records
+    disagreements. Runs from a background task, never on the request path.
+    """
+
+    def __init__(self, sample_rate: float = SHADOW_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._candidate: Optional[AIEngine] = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and os.path.exists(SHADOW_MODEL_POINTER) and random.random() < self.sample_rate
+
+    def _current_candidate(self) -> Optional[AIEngine]:
+        """Candidate engine for the shadow pointer, reloaded when the pointer changes"""
+        try:
+            stamp = file_stamp(SHADOW_MODEL_POINTER)
+        except OSError:
+            return None
+        with self._lock:
+            if stamp != self._stamp:
+                pointer = _read_pointer(SHADOW_MODEL_POINTER)
+                self._candidate = None
+                if pointer:
+                    self._candidate = AIEngine(model_path=pointer["model_path"], version=pointer["version"])
+                self._stamp = stamp
+            return self._candidate
+
+    def score(self, text: str, message_id: Optional[str] = None):
+        """Blocking: compare live and candidate predictions for one message"""
+        candidate = self._current_candidate()
+        live = get_ai_engine()
+        if candidate is None or candidate.version == live.version:
+            return
+
+        started = time.perf_counter()
+        live_label, live_confidence = live.predict(text)
+        live_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        candidate_label, candidate_confidence = candidate.predict(text)
+        candidate_ms = (time.perf_counter() - started) * 1000
+
+        prefix = f"shadow.{candidate.version}"
+        metrics.counter(f"{prefix}.scored").inc()
+        metrics.histogram(f"{prefix}.live_ms").observe(live_ms)
+        metrics.histogram(f"{prefix}.candidate_ms").observe(candidate_ms)
+        if live_label == candidate_label:
+            return
+
+        metrics.counter(f"{prefix}.disagreements").inc()
+        record = {
+            "message_id": message_id,
+            "text": text,
+            "live_version": live.version,
+            "live_prediction": live_label,
+            "live_confidence": round(live_confidence, 4),
+            "candidate_version": candidate.version,
+            "candidate_prediction": candidate_label,
+            "candidate_confidence": round(candidate_confidence, 4),
+            "recorded_at": datetime.utcnow().isoformat()
+        }
+        os.makedirs(SHADOW_LOG_DIR, exist_ok=True)
+        with open(os.path.join(SHADOW_LOG_DIR, f"{candidate.version}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def stats(self) -> Dict:
+        """Agreement and latency of the current candidate in this worker"""
+        pointer = _read_pointer(SHADOW_MODEL_POINTER)
+        if not pointer:
+            return {"candidate": None}
+        prefix = f"shadow.{pointer['version']}"
+        snapshot = metrics.snapshot(prefix)
+        scored = snapshot["counters"].get(f"{prefix}.scored", 0)
+        disagreements = snapshot["counters"].get(f"{prefix}.disagreements", 0)
+        live_ms = snapshot["histograms"].get(f"{prefix}.live_ms")
+        candidate_ms = snapshot["histograms"].get(f"{prefix}.candidate_ms")
+        return {
+            "candidate": pointer,
+            "sample_rate": self.sample_rate,
+            "scored": scored,
+            "disagreements": disagreements,
+            "agreement_rate": round(1 - disagreements / scored, 4) if scored else None,
+            "live_mean_ms": live_ms["mean"] if live_ms else None,
+            "candidate_mean_ms": candidate_ms["mean"] if candidate_ms else None
+        }
+
+
+# Global registry and shadow scorer
+_registry = None
+_shadow_scorer = None
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
+
+def get_shadow_scorer() -> ShadowScorer:
+    global _shadow_scorer
+    if _shadow_scorer is None:
+        _shadow_scorer = ShadowScorer()
+    return _shadow_scorer
@@ -5,8 +5,12 @@ Pydantic models for request/response validation
 from pydantic import BaseModel, EmailStr, Field, validator
 from typing import Optional, List
 from datetime import datetime
+import os
 import uuid
 
+# Upper bound on messages accepted by one /check/batch call
+MAX_BATCH_MESSAGES = int(os.getenv("CHECK_BATCH_MAX_MESSAGES", "1000"))
+
 # Auth schemas
 class UserRegister(BaseModel):
     email: EmailStr
@@ -61,6 +65,12 @@ class EntityResponse(BaseModel):
 # Message check schemas
 class MessageCheck(BaseModel):
     message: str = Field(..., min_length=10, max_length=5000)
+    # Always ask the language model for the explanation (seconds), even when the
+    # rules or the local classifier are decisive (milliseconds)
+    ai_explanation: bool = False
+    # When the LLM is needed, answer now and fill the explanation in later
+    # (GET /check/result/{message_id}) instead of waiting for it
+    async_explanation: bool = False
     
     @validator('message')
     def validate_message(cls, v):
@@ -68,6 +78,16 @@ class MessageCheck(BaseModel):
             raise ValueError('Message cannot be empty')
         return v.strip()
 
+class BatchMessageCheck(BaseModel):
+    messages: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_MESSAGES)
+    
+    @validator('messages', each_item=True)
+    def validate_message(cls, v):
+        v = v.strip()
+        if len(v) < 10 or len(v) > 5000:
+            raise ValueError('Each message must be between 10 and 5000 characters')
+        return v
+
 class RedFlag(BaseModel):
     flag: str
     severity: str = "medium"
@@ -82,6 +102,13 @@ class RiskCheckResult(BaseModel):
     ai_confidence: Optional[float] = None
     rules_score: Optional[int] = None
     message_id: Optional[str] = None
+    job_id: Optional[str] = None
+    # complete, or for async explanations: pending, running, done, failed, rejected (queue full)
+    explanation_status: Optional[str] = None
+
+class BatchCheckResult(BaseModel):
+    total: int
+    results: List[RiskCheckResult]
 
 # Report schemas
 class EvidenceCreate(BaseModel):
@@ -0,0 +1,323 @@
+"""
+CheckBhai Near-Duplicate Index - Reuse LLM explanations across scam campaigns
+Campaign messages share a template and differ in phone numbers, amounts,
+links or names ("Sudhu 3000 taka" / "Sudhu 2500 taka"), so the exact LLM
+cache misses them. This index keeps recent LLM analyses in memory under a
+MinHash signature of the message with identifiers masked:
+- URLs, e-mail addresses, phone numbers and any token containing a digit
+  become placeholders before shingling (character 5-grams)
+- LSH banding finds candidates; the best candidate whose estimated Jaccard
+  similarity reaches the threshold, and whose rules verdict (risk level and
+  flag set) is the same as the new message's, is a match. A small edit can
+  change the verdict ("... Send OTP."), and an explanation written for the
+  other verdict would contradict it
+- a match's explanation is adapted to the new message: its identifiers are
+  swapped in. Candidates whose identifiers cannot be paired one-to-one with
+  the new message's (one phone number against two) are not matches: their
+  explanation would quote numbers or links from someone else's message
+Bounded (LRU, with a TTL). Reported under near_dup.*.
+"""
+
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from app.metrics import metrics
+from app.text_normalizer import normalize_text
+
+# Estimated Jaccard similarity (masked 5-gram shingles) that counts as the same message
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+
+# Analyses kept per worker, and seconds each one may be reused
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "5000"))
+NEAR_DUP_TTL = float(os.getenv("NEAR_DUP_TTL", "86400"))
+
+# MinHash permutations and LSH bands (permutations must divide evenly into bands)
+NEAR_DUP_NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "64"))
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", "16"))
+
+SHINGLE_SIZE = 5
+
+# Masked in this order; "number" catches amounts, codes, account and tracking ids
+# (without surrounding punctuation: "(3000)," is the identifier 3000)
+IDENTIFIER_PATTERNS = (
+    ("url", re.compile(r'(?:https?://|www\.)\S+', re.IGNORECASE)),
+    ("email", re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')),
+    ("phone", re.compile(r'(?:\+?88)?01[3-9]\d{8}\b')),
+    ("number", re.compile(r'[^\s(\[\'"]*\d(?:\S*\w)?')),
+)
+
+# An identifier in an explanation is only swapped when it stands on its own, not
+# inside a longer number, word, link or address ("3000" in "13000" or ".../3000")
+IDENTIFIER_START = r'(?<![\w./@])'
+IDENTIFIER_END = r'(?![\w/@]|[.,]\w)'
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+SIMILARITY_BUCKETS = (0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 0.99, 1.0)
+
+BANGLA_DIGIT_TABLE = str.maketrans("0123456789", "০১২৩৪৫৬৭৮৯")
+
+
+def mask_identifiers(text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Text with identifiers replaced by <kind> placeholders, and the identifiers in order"""
+    found: List[Tuple[int, str, str]] = []
+
+    def masker(kind):
+        def replace(match):
+            found.append((match.start(), kind, match.group(0)))
+            return f" <{kind}> "
+        return replace
+
+    for kind, pattern in IDENTIFIER_PATTERNS:
+        text = pattern.sub(masker(kind), text)
+    # Offsets shift as earlier kinds are masked, but each kind keeps its own order
+    identifiers = [(kind, value) for _, kind, value in sorted(found, key=lambda item: (item[1], item[0]))]
+    return text, identifiers
+
+
+def canonical_form(text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Identifier-masked, normalized text used for shingling. Masking comes first:
+    normalization rewrites identifiers ("www." collapses to "w.") so that the
+    patterns would no longer find them.
+    """
+    masked, identifiers = mask_identifiers(text)
+    return " ".join(normalize_text(masked).split()), identifiers
+
+
+@dataclass
+class NearDuplicateEntry:
+    signature: np.ndarray
+    identifiers: List[Tuple[str, str]]
+    risk_level: str
+    rule_flags: FrozenSet[str]
+    explanation_en: Optional[str]
+    explanation_bn: Optional[str]
+    red_flags: List[str]
+    expires_at: float
+
+
+@dataclass
+class NearDuplicateMatch:
+    entry: NearDuplicateEntry
+    similarity: float
+
+
+class NearDuplicateIndex:
+    """MinHash LSH over recent LLM analyses (this worker process)"""
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, max_entries: int = NEAR_DUP_MAX_ENTRIES,
+                 ttl: float = NEAR_DUP_TTL, num_perm: int = NEAR_DUP_NUM_PERM, bands: int = NEAR_DUP_BANDS,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Fixed seed: signatures stay comparable across restarts and workers
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._entries: "OrderedDict[int, NearDuplicateEntry]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], set] = {}
+        self._ids = 0
+
+        self._size = metrics.gauge("near_dup.entries")
+        self._lookups = metrics.counter("near_dup.lookups")
+        self._hits = metrics.counter("near_dup.hits")
+        self._candidates = metrics.counter("near_dup.candidates")
+        self._verdict_mismatches = metrics.counter("near_dup.verdict_mismatches")
+        self._unpaired = metrics.counter("near_dup.unpaired_identifiers")
+        self._similarity = metrics.histogram("near_dup.similarity", buckets=SIMILARITY_BUCKETS)
+        self._lookup_ms = metrics.histogram("near_dup.lookup_ms")
+
+    def signature(self, canonical: str) -> np.ndarray:
+        shingles = {canonical[i:i + SHINGLE_SIZE] for i in range(max(1, len(canonical) - SHINGLE_SIZE + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # Universal hashing (a*h + b) mod p, one row per permutation; uint64 overflow wraps
+        permuted = (np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def lookup(self, text: str, risk_level: str, rule_flags: List[str]) -> Optional[NearDuplicateMatch]:
+        """
+        Closest live entry at or above the threshold with the same rules
+        verdict and identifiers that pair with text's, if any
+        """
+        started = time.perf_counter()
+        verdict = (risk_level, frozenset(rule_flags))
+        mismatched = unpaired = False
+        self._lookups.inc()
+        canonical, identifiers = canonical_form(text)
+        signature = self.signature(canonical)
+        now = time.monotonic()
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        self._candidates.inc(len(candidates))
+
+        best_id, best = None, 0.0
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            if entry.expires_at <= now:
+                self._remove(entry_id)
+                continue
+            similarity = float(np.mean(entry.signature == signature))
+            if (entry.risk_level, entry.rule_flags) != verdict:
+                mismatched = mismatched or similarity >= self.threshold
+                continue
+            if similarity > best and self._pairing(entry.identifiers, identifiers) is None:
+                unpaired = unpaired or similarity >= self.threshold
+                continue
+            if similarity > best:
+                best_id, best = entry_id, similarity
+        self._lookup_ms.observe((time.perf_counter() - started) * 1000)
+
+        if best_id is None or best < self.threshold:
+            if mismatched:
+                # Similar enough, but the rules judge this message differently: ask the LLM
+                self._verdict_mismatches.inc()
+            if unpaired:
+                # Similar enough, but the explanation's identifiers could not all be replaced
+                self._unpaired.inc()
+            return None
+        self._entries.move_to_end(best_id)
+        self._hits.inc()
+        self._similarity.observe(best)
+        return NearDuplicateMatch(self._entries[best_id], best)
+
+    def add(self, text: str, ai_result: Dict, risk_level: str, rule_flags: List[str]):
+        """Index an LLM analysis of text (risk_level, rule_flags: the rules verdict on it)"""
+        canonical, _ = canonical_form(text)
+        entry = NearDuplicateEntry(
+            signature=self.signature(canonical),
+            identifiers=mask_identifiers(text)[1],
+            risk_level=risk_level,
+            rule_flags=frozenset(rule_flags),
+            explanation_en=ai_result.get("explanation_en"),
+            explanation_bn=ai_result.get("explanation_bn"),
+            red_flags=list(ai_result.get("red_flags", [])),
+            expires_at=time.monotonic() + self.ttl
+        )
+        self._ids += 1
+        self._entries[self._ids] = entry
+        for key in self._band_keys(entry.signature):
+            self._buckets.setdefault(key, set()).add(self._ids)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+        self._size.set(len(self._entries))
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        for key in self._band_keys(entry.signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+        self._size.set(len(self._entries))
+
+    def clear(self) -> int:
+        """Drop every entry (e.g. after the LLM prompt changed); returns how many"""
+        dropped = len(self._entries)
+        self._entries.clear()
+        self._buckets.clear()
+        self._size.set(0)
+        return dropped
+
+    def adapt(self, match: NearDuplicateMatch, text: str) -> Optional[Dict]:
+        """
+        The matched analysis rewritten for text: explanation_en, explanation_bn
+        (identifiers swapped in) and red_flags (the LLM's flags plus the rule
+        flags, which are the same for both messages). None if the identifiers
+        do not pair up, so the caller asks the LLM instead.
+        """
+        entry = match.entry
+        substitute = self._substitution(entry.identifiers, mask_identifiers(text)[1])
+        if substitute is None:
+            return None
+        adapted = {"red_flags": list(dict.fromkeys(entry.red_flags + sorted(entry.rule_flags)))}
+        for field in ("explanation_en", "explanation_bn"):
+            explanation = getattr(entry, field)
+            if explanation is not None:
+                adapted[field] = substitute(explanation)
+        return adapted
+
+    @staticmethod
+    def _pairing(old: List[Tuple[str, str]], new: List[Tuple[str, str]]) -> Optional[Dict[str, str]]:
+        """
+        Each identifier of the earlier message mapped to its counterpart (same
+        kind, same position). None unless every kind occurs equally often in
+        both and each earlier value has a single counterpart.
+        """
+        mapping = {}
+        for kind in {kind for kind, _ in old + new}:
+            old_values = [value for k, value in old if k == kind]
+            new_values = [value for k, value in new if k == kind]
+            if len(old_values) != len(new_values):
+                return None
+            for before, after in zip(old_values, new_values):
+                if mapping.setdefault(before, after) != after:
+                    return None
+        return mapping
+
+    @classmethod
+    def _substitution(cls, old: List[Tuple[str, str]], new: List[Tuple[str, str]]):
+        """Rewrites an explanation of the earlier message for the new one (None if they do not pair up)"""
+        pairing = cls._pairing(old, new)
+        if pairing is None:
+            return None
+        mapping = {}
+        for before, after in pairing.items():
+            if before != after:
+                mapping.setdefault(before, after)
+                # Bangla explanations may write the digits in Bangla
+                mapping.setdefault(before.translate(BANGLA_DIGIT_TABLE), after.translate(BANGLA_DIGIT_TABLE))
+        if not mapping:
+            return lambda explanation: explanation
+        pattern = re.compile(
+            IDENTIFIER_START
+            + "(?:" + "|".join(re.escape(value) for value in sorted(mapping, key=len, reverse=True)) + ")"
+            + IDENTIFIER_END
+        )
+        return lambda explanation: pattern.sub(lambda m: mapping[m.group(0)], explanation)
+
+    def stats(self) -> Dict:
+        counters = metrics.snapshot("near_dup")["counters"]
+        lookups = counters.get("near_dup.lookups", 0)
+        hits = counters.get("near_dup.hits", 0)
+        return {
+            "threshold": self.threshold,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            **metrics.snapshot("near_dup")
+        }
+
+
+# Global index
+_near_duplicate_index = None
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    global _near_duplicate_index
+    if _near_duplicate_index is None:
+        _near_duplicate_index = NearDuplicateIndex()
+    return _near_duplicate_index
@@ -0,0 +1,163 @@
+"""
+CheckBhai Online Learner - Incremental updates for the scam classifier
+HashingVectorizer needs no fitted vocabulary and MultinomialNB supports
+partial_fit, so a feedback batch updates the model in time proportional to
+the batch alone. Every update is checkpointed; every N updates the model is
+refit from the corpus plus the (deduplicated, windowed) feedback log to
+correct for drift.
+"""
+
+import json
+import os
+import pickle
+import threading
+from typing import Callable, Dict, List, Tuple
+
+from app.text_normalizer import normalize_text
+
+# Feedback batches between full refits (0 disables periodic refits)
+ONLINE_FULL_REFIT_EVERY = int(os.getenv("ONLINE_FULL_REFIT_EVERY", "50"))
+
+# Most recent feedback items kept for full refits
+ONLINE_FEEDBACK_WINDOW = int(os.getenv("ONLINE_FEEDBACK_WINDOW", "10000"))
+
+ONLINE_HASH_FEATURES = 2 ** 18
+CLASSES = [0, 1]
+
+
+def build_online_pipeline(n_features: int = ONLINE_HASH_FEATURES, alpha: float = 0.1):
+    """Same char_wb n-grams as the TF-IDF model, hashed instead of looked up"""
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.naive_bayes import MultinomialNB
+    from sklearn.pipeline import Pipeline
+
+    return Pipeline([
+        ('hashing', HashingVectorizer(
+            ngram_range=(1, 3),
+            analyzer='char_wb',
+            n_features=n_features,
+            alternate_sign=False,  # MultinomialNB needs non-negative features
+            norm='l2'
+        )),
+        ('clf', MultinomialNB(alpha=alpha))
+    ])
+
+
+class OnlineClassifier:
+    """
+    Hashing + partial_fit NB model with a checkpoint and a feedback log:
+
+        <directory>/checkpoint.pkl   model + counters, replaced atomically
+        <directory>/feedback.jsonl   every feedback item, append-only
+    """
+
+    def __init__(self, directory: str, refit_every: int = ONLINE_FULL_REFIT_EVERY,
+                 feedback_window: int = ONLINE_FEEDBACK_WINDOW):
+        self.directory = directory
+        self.checkpoint_path = os.path.join(directory, "checkpoint.pkl")
+        self.feedback_path = os.path.join(directory, "feedback.jsonl")
+        self.refit_every = refit_every
+        self.feedback_window = feedback_window
+        self.pipeline = None
+        self.samples_seen = 0
+        self.updates_since_refit = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.pipeline is not None
+
+    def predict_proba(self, texts: List[str]):
+        """texts must already be normalized"""
+        return self.pipeline.predict_proba(texts)
+
+    def fit(self, texts: List[str], labels: List[int]):
+        """Full refit from scratch; texts must already be normalized"""
+        pipeline = build_online_pipeline()
+        pipeline.fit(texts, labels)
+        with self._lock:
+            self.pipeline = pipeline
+            self.samples_seen = len(texts)
+            self.updates_since_refit = 0
+            self.save_checkpoint()
+
+    def partial_fit(self, new_texts: List[str], new_labels: List[int],
+                    corpus: Callable[[], List[Tuple[str, int]]]) -> bool:
+        """
+        Apply one feedback batch. Returns True if it triggered a full refit
+        over corpus() + feedback log instead of a plain incremental update;
+        corpus is only called for a refit.
+        """
+        texts = [normalize_text(text) for text in new_texts]
+        self._append_feedback(texts, new_labels)
+
+        with self._lock:
+            if self.pipeline is None:
+                refit = True
+            else:
+                self.updates_since_refit += 1
+                refit = bool(self.refit_every) and self.updates_since_refit >= self.refit_every
+
+        if refit:
+            items = corpus()
+            corpus_texts = [text for text, _ in items]
+            corpus_labels = [label for _, label in items]
+            feedback_texts, feedback_labels = self._load_feedback()
+            self.fit(corpus_texts + feedback_texts, corpus_labels + feedback_labels)
+            return True
+
+        with self._lock:
+            # In place: HashingVectorizer is stateless, and NB partial_fit adds
+            # the batch to its counts, then rebinds (never mutates) the log
+            # probabilities that predictions read. Input is validated before
+            # any count changes, so a rejected batch leaves the model as it was.
+            features = self.pipeline.named_steps['hashing'].transform(texts)
+            self.pipeline.named_steps['clf'].partial_fit(features, new_labels, classes=CLASSES)
+            self.samples_seen += len(texts)
+            self.save_checkpoint()
+        return False
+
+    def _append_feedback(self, texts: List[str], labels: List[int]):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.feedback_path, "a", encoding="utf-8") as f:
+            for text, label in zip(texts, labels):
+                f.write(json.dumps({"text": text, "label": int(label)}, ensure_ascii=False) + "\n")
+
+    def _load_feedback(self) -> Tuple[List[str], List[int]]:
+        """Feedback for a full refit: latest label per text, most recent window only"""
+        latest: Dict[str, int] = {}
+        if os.path.exists(self.feedback_path):
+            with open(self.feedback_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from a crash mid-append
+                    # Re-inserting moves a relabelled text to the end (most recent)
+                    latest.pop(item["text"], None)
+                    latest[item["text"]] = item["label"]
+        items = list(latest.items())[-self.feedback_window:] if self.feedback_window else list(latest.items())
+        return [text for text, _ in items], [label for _, label in items]
+
+    def save_checkpoint(self):
+        """Write model + counters to a temp file and rename it into place"""
+        os.makedirs(self.directory, exist_ok=True)
+        staging = f"{self.checkpoint_path}.tmp-{os.getpid()}"
+        with open(staging, "wb") as f:
+            pickle.dump({
+                "pipeline": self.pipeline,
+                "samples_seen": self.samples_seen,
+                "updates_since_refit": self.updates_since_refit
+            }, f)
+        os.replace(staging, self.checkpoint_path)
+
+    def load_checkpoint(self) -> bool:
+        if not os.path.exists(self.checkpoint_path):
+            return False
+        with open(self.checkpoint_path, "rb") as f:
+            state = pickle.load(f)
+        with self._lock:
+            self.pipeline = state["pipeline"]
+            self.samples_seen = state["samples_seen"]
+            self.updates_since_refit = state["updates_since_refit"]
+        return True
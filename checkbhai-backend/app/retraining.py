@@ -0,0 +1,244 @@
+"""
+CheckBhai Retraining Service - Background classifier retraining
+Fits a new classifier in a separate process from the built-in corpus plus the
+admin-verified TrainingData table, validates it on a holdout split, writes a
+versioned artifact and publishes it. Every worker polls the published pointer
+and hot-swaps its AI engine; no request waits on training.
+"""
+
+import asyncio
+import os
+import pickle
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, or_, select
+
+from app.ai_engine import (
+    AIEngine, CURRENT_MODEL_POINTER, build_pipeline, builtin_corpus, get_ai_engine, read_current_model,
+    swap_ai_engine
+)
+from app.classifier_artifact import export_artifact
+from app.corpus_cache import CorpusCache, Watermark, corpus_digest, read_state, read_watermark
+from app.database import AsyncSessionLocal, TrainingData
+from app.executors import get_executor
+from app.model_registry import VERSIONS_DIR, get_model_registry
+from app.rule_pack import file_stamp
+
+# Fraction of samples held out to validate a new model before publishing it
+RETRAIN_HOLDOUT_FRACTION = float(os.getenv("RETRAIN_HOLDOUT_FRACTION", "0.2"))
+
+# TrainingData rows fetched per keyset page
+TRAINING_PAGE_SIZE = int(os.getenv("TRAINING_PAGE_SIZE", "1000"))
+
+# A candidate below this holdout accuracy is rejected
+RETRAIN_MIN_ACCURACY = float(os.getenv("RETRAIN_MIN_ACCURACY", "0.7"))
+
+# Publish an accepted model right away; otherwise it becomes the shadow candidate
+RETRAIN_AUTO_PUBLISH = os.getenv("RETRAIN_AUTO_PUBLISH", "true").lower() == "true"
+
+# Seconds between checks for a newly published model (0 disables)
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
+
+
+def _in_holdout(sample_hash: str, fraction: float) -> bool:
+    """Stable split on the sample's content hash: same side in every run"""
+    return int(sample_hash[:8], 16) / 2 ** 32 < fraction
+
+
+def _evaluate(predictions: np.ndarray, labels: np.ndarray) -> Dict:
+    true_positive = int(np.sum((predictions == 1) & (labels == 1)))
+    predicted_positive = int(np.sum(predictions == 1))
+    actual_positive = int(np.sum(labels == 1))
+    return {
+        "holdout_size": len(labels),
+        "accuracy": round(float(np.mean(predictions == labels)), 4),
+        "scam_precision": round(true_positive / predicted_positive, 4) if predicted_positive else None,
+        "scam_recall": round(true_positive / actual_positive, 4) if actual_positive else None
+    }
+
+
+def fit_and_export(new_rows: List[Tuple[str, int]], watermark: Optional[Watermark], version: str,
+                   holdout_fraction: float, min_accuracy: float) -> Dict:
+    """
+    Runs in the training process. Adds the new rows to the corpus cache
+    (tokenizing only those), validates on a holdout split, then fits on every
+    sample and writes <version>.pkl plus the <version>/ artifact.
+    """
+    started = time.perf_counter()
+    cache = CorpusCache(build_pipeline())
+    with cache.locked():
+        cache.load(builtin_corpus())
+        added, relabelled = cache.add(new_rows)
+        cache.save(watermark)
+        corpus = {"training_size": len(cache.labels), "new_samples": added, "relabelled": relabelled}
+
+        labels = np.array(cache.labels)
+        in_holdout = np.array([_in_holdout(h, holdout_fraction) for h in cache.row_hashes()])
+        train_rows, holdout_rows = np.flatnonzero(~in_holdout), np.flatnonzero(in_holdout)
+
+        metrics = None
+        if len(holdout_rows) and len(set(labels[train_rows])) == 2:
+            candidate, columns = cache.fit(train_rows)
+            metrics = _evaluate(cache.predict(candidate, columns, holdout_rows), labels[holdout_rows])
+            if metrics["accuracy"] < min_accuracy:
+                return {"version": version, "accepted": False, **corpus, "metrics": metrics,
+                        "reason": f"holdout accuracy {metrics['accuracy']} < {min_accuracy}"}
+
+        pipeline, _ = cache.fit()
+    fit_seconds = round(time.perf_counter() - started, 3)
+
+    model_path = os.path.join(VERSIONS_DIR, f"{version}.pkl")
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    # Exclusive create: never overwrite a registered version
+    with open(model_path, "xb") as f:
+        pickle.dump(pipeline, f)
+    export_artifact(pipeline, os.path.splitext(model_path)[0], extra_meta={
+        "version": version,
+        **corpus,
+        "metrics": metrics,
+        "fit_seconds": fit_seconds
+    })
+    return {"version": version, "accepted": True, "model_path": model_path,
+            **corpus, "metrics": metrics, "fit_seconds": fit_seconds}
+
+
+def load_engine(model_path: str, version: str) -> AIEngine:
+    """Build and warm an engine off the event loop, ready to be swapped in"""
+    engine = AIEngine(model_path=model_path, version=version)
+    engine.scorer  # load the artifact before any request can see the engine
+    return engine
+
+
+async def fetch_new_training_rows(after: Optional[Watermark]) -> Tuple[List[Tuple[str, int]], Optional[Watermark]]:
+    """
+    Admin-verified TrainingData rows added after the watermark, read in
+    keyset pages ordered by (created_at, id). Returns (rows, new watermark).
+    """
+    rows = []
+    async with AsyncSessionLocal() as db:
+        while True:
+            query = (
+                select(TrainingData.id, TrainingData.created_at, TrainingData.text, TrainingData.label)
+                .filter(TrainingData.verified_by_admin == True)
+                .order_by(TrainingData.created_at, TrainingData.id)
+                .limit(TRAINING_PAGE_SIZE)
+            )
+            if after:
+                last_created_at, last_id = after[0], uuid.UUID(str(after[1]))
+                query = query.filter(or_(
+                    TrainingData.created_at > last_created_at,
+                    and_(TrainingData.created_at == last_created_at, TrainingData.id > last_id)
+                ))
+            page = (await db.execute(query)).all()
+            rows.extend((text, 1 if label == 'Scam' else 0) for _, _, text, label in page)
+            if page:
+                after = (page[-1].created_at, str(page[-1].id))
+            if len(page) < TRAINING_PAGE_SIZE:
+                return rows, after
+
+
+class ModelRetrainer:
+    """Runs at most one retrain at a time on the executor's training lane"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.last_result: Optional[Dict] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, force: bool = False) -> bool:
+        """Start a retrain in the background; False if one is already running"""
+        if self.is_running:
+            return False
+        self._task = asyncio.create_task(self.retrain(force=force))
+        return True
+
+    async def retrain(self, force: bool = False) -> Dict:
+        """
+        Train, validate and publish a new version. Without force, nothing is
+        trained when the corpus cache already holds every verified row and the
+        current built-in corpus: the last run saw exactly the same data.
+        """
+        started_at = datetime.utcnow().isoformat()
+        try:
+            # Only rows the corpus cache has not seen yet leave the database
+            builtin_digest = corpus_digest(builtin_corpus())
+            new_rows, watermark = await fetch_new_training_rows(read_watermark(builtin_digest=builtin_digest))
+            state = read_state()
+            corpus_unchanged = bool(state) and state.get("builtin_digest") == builtin_digest
+            if not new_rows and corpus_unchanged and not force:
+                print("Classifier retrain skipped: no new training data")
+                self.last_result = {"accepted": False, "skipped": True, "reason": "no changes",
+                                    "started_at": started_at}
+                return self.last_result
+            version = get_model_registry().new_version()
+            # A single spawned process: training never competes with request scoring
+            result = await get_executor().run(
+                fit_and_export, new_rows, watermark, version,
+                RETRAIN_HOLDOUT_FRACTION, RETRAIN_MIN_ACCURACY, lane="training"
+            )
+            if result["accepted"] and RETRAIN_AUTO_PUBLISH:
+                get_model_registry().promote(version)
+                # This worker swaps now; the others pick up the pointer on their next poll
+                engine = await get_executor().run(load_engine, result["model_path"], result["version"], lane="thread")
+                swap_ai_engine(engine)
+                print(f"Classifier {version} published ({result['training_size']} samples)")
+            elif result["accepted"]:
+                get_model_registry().set_shadow(version)
+                print(f"Classifier {version} registered as shadow candidate")
+            else:
+                print(f"Classifier {version} rejected: {result['reason']}")
+        except Exception as e:
+            print(f"Classifier retraining failed: {e}")
+            result = {"accepted": False, "reason": str(e)}
+        result["started_at"] = started_at
+        self.last_result = result
+        return result
+
+    def status(self) -> Dict:
+        return {
+            "running": self.is_running,
+            "current": read_current_model(),
+            "shadow": get_model_registry().shadow(),
+            "last_result": self.last_result
+        }
+
+
+async def watch_current_model(interval: float = MODEL_RELOAD_INTERVAL):
+    """Background task: follow the published model pointer and hot-swap the engine"""
+    stamp = None
+    if os.path.exists(CURRENT_MODEL_POINTER):
+        stamp = file_stamp(CURRENT_MODEL_POINTER)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not os.path.exists(CURRENT_MODEL_POINTER):
+                continue
+            current_stamp = file_stamp(CURRENT_MODEL_POINTER)
+            if current_stamp == stamp:
+                continue
+            stamp = current_stamp
+            current = read_current_model()
+            if not current or current["version"] == get_ai_engine().version:
+                continue
+            engine = await get_executor().run(load_engine, current["model_path"], current["version"], lane="thread")
+            swap_ai_engine(engine)
+            print(f"Classifier hot-swapped to version {current['version']}")
+        except Exception as e:
+            print(f"Model watcher error: {e}")
+
+
+# Global retrainer (one per worker; only the worker that receives the request trains)
+_retrainer = None
+
+def get_retrainer() -> ModelRetrainer:
+    global _retrainer
+    if _retrainer is None:
+        _retrainer = ModelRetrainer()
+    return _retrainer
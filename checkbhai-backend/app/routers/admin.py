@@ -3,19 +3,26 @@ Admin routes - Minimal, Strong Admin Panel
 - View all reports
 - Mark report as Verified
 - Remove spam reports
-NO AI training, NO analytics bloat
+- Trigger background classifier retraining
+- Manage classifier versions (promote, shadow candidate)
+- Inspect and invalidate the LLM response cache
+NO analytics bloat
 """
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
-from typing import List
+from typing import List, Optional
 import uuid
 from datetime import datetime, timedelta
 
 from app.database import Report, User, Entity, ActivityLog, get_db
 from app.models import ReportResponse
 from app.auth import get_current_admin
+from app.retraining import get_retrainer
+from app.model_registry import get_model_registry, get_shadow_scorer
+from app.services.ai_service import get_ai_service
+from app.near_duplicate import get_near_duplicate_index
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -242,3 +249,113 @@ async def delete_spam_report(
     await db.commit()
     
     return {"message": "Report marked as spam", "report_id": str(report_id)}
+
+
+@router.post("/model/retrain", status_code=status.HTTP_202_ACCEPTED)
+async def retrain_model(
+    force: bool = Query(False, description="Retrain even if no verified training data arrived since the last run"),
+    current_admin: User = Depends(get_current_admin)
+):
+    """
+    Start a background classifier retrain (corpus + verified training data).
+    Without new training data since the last run it trains and publishes nothing
+    (last_result.reason "no changes").
+    """
+    retrainer = get_retrainer()
+    if not retrainer.start(force=force):
+        raise HTTPException(status_code=409, detail="A retrain is already running")
+    return {"message": "Retraining started", **retrainer.status()}
+
+
+@router.get("/model")
+async def get_model_status(
+    current_admin: User = Depends(get_current_admin)
+):
+    """Published classifier version and the last retrain outcome"""
+    from app.ai_engine import get_ai_engine
+    return {"serving_version": get_ai_engine().version, **get_retrainer().status()}
+
+
+@router.get("/model/versions")
+async def list_model_versions(
+    current_admin: User = Depends(get_current_admin)
+):
+    """Registered classifier versions with training size, metrics and fit time"""
+    return get_model_registry().list_versions()
+
+
+@router.post("/model/versions/{version}/promote")
+async def promote_model_version(
+    version: str,
+    current_admin: User = Depends(get_current_admin)
+):
+    """Make a registered version live (workers swap on their next poll)"""
+    try:
+        get_model_registry().promote(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": f"Model {version} promoted"}
+
+
+@router.get("/model/shadow")
+async def get_shadow_status(
+    current_admin: User = Depends(get_current_admin)
+):
+    """Shadow candidate agreement and latency (this worker's sample)"""
+    return get_shadow_scorer().stats()
+
+
+@router.put("/model/shadow/{version}")
+async def set_shadow_model(
+    version: str,
+    current_admin: User = Depends(get_current_admin)
+):
+    """Score a sample of /check/message traffic with this version in shadow mode"""
+    try:
+        get_model_registry().set_shadow(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": f"Model {version} is now the shadow candidate"}
+
+
+@router.delete("/model/shadow")
+async def clear_shadow_model(
+    current_admin: User = Depends(get_current_admin)
+):
+    """Stop shadow scoring"""
+    get_model_registry().clear_shadow()
+    return {"message": "Shadow scoring disabled"}
+
+
+@router.get("/llm-cache")
+async def get_llm_cache_status(
+    current_admin: User = Depends(get_current_admin)
+):
+    """LLM response cache hit rates (this worker) and stored entries per prompt version"""
+    return await get_ai_service().cache.stats()
+
+
+@router.delete("/llm-cache")
+async def invalidate_llm_cache(
+    prompt_version: Optional[str] = Query(None, description="Only drop entries of this prompt version"),
+    current_admin: User = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Drop cached LLM analyses (all, or one prompt version) from the shared
+    table and this worker's memory, along with this worker's near-duplicate
+    index. Other workers' memory entries expire within LLM_CACHE_MEMORY_TTL
+    (near-duplicate entries within NEAR_DUP_TTL).
+    """
+    deleted = await get_ai_service().cache.invalidate(prompt_version)
+    get_near_duplicate_index().clear()
+    
+    log = ActivityLog(
+        user_id=current_admin.id,
+        action="invalidate_llm_cache",
+        extra_metadata={"prompt_version": prompt_version, "deleted": deleted}
+    )
+    db.add(log)
+    await db.commit()
+    
+    return {"message": "LLM cache invalidated", "deleted": deleted}
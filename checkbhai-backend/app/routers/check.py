@@ -4,80 +4,194 @@ Message checking routes - core scam detection functionality
  - Risk Level from Rules Engine ONLY (Deterministic)
  - AI used ONLY for explanation/summary
  - No fake probabilities
+ Explanations are built locally (fired rules + the classifier's strongest
+ scam words); the LLM explanation is fetched only when the rules and the
+ classifier are not enough, or a request asks for it.
+ /check/message/stream sends the rules verdict first and streams the rest (SSE).
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from sqlalchemy import insert
+from typing import List, Optional, Tuple
+from datetime import datetime
+import json
+import uuid
 
-from app.database import Message, User, get_db
-from app.models import MessageCheck, RiskCheckResult
+from app.database import AsyncSessionLocal, Message, User, get_db
+from app.models import MessageCheck, RiskCheckResult, BatchMessageCheck, BatchCheckResult
 from app.services.ai_service import get_ai_service
-from app.rules_engine import RulesEngine
-from app.auth import get_current_user_optional
+from app.ai_engine import get_ai_engine
+from app.rules_engine import get_rules_engine, evaluate_message, evaluate_messages
+from app.executors import get_executor
+from app.model_registry import get_shadow_scorer
+from app.tiered_inference import get_tiered_inference
+from app.explanation_jobs import get_explanation_queue
+from app.llm_scheduler import llm_priority
+from app.near_duplicate import get_near_duplicate_index
+from app.auth import get_current_user, get_current_user_optional
 from app.utils import get_fingerprint
 
 router = APIRouter(prefix="/check", tags=["scam-detection"])
 
+
+async def _classifier_evidence(texts: List[str], wanted: List[bool]) -> List[Tuple[Optional[float], List[str]]]:
+    """
+    (Scam probability, top words) from the local classifier for the wanted
+    messages, (None, []) for the rest. Never fails the request.
+    """
+    evidence = [(None, []) for _ in texts]
+    indices = [i for i, want in enumerate(wanted) if want]
+    if not indices:
+        return evidence
+    engine = get_ai_engine()
+    wanted_texts = [texts[i] for i in indices]
+    try:
+        assessed = await get_executor().run(
+            engine.assess_batch, wanted_texts,
+            size=sum(engine.scoring_size(text) for text in wanted_texts), allow_process=False
+        )
+    except Exception as e:
+        print(f"Classifier evidence failed (non-critical): {e}")
+        return evidence
+    for i, item in zip(indices, assessed):
+        evidence[i] = item
+    return evidence
+
+
+async def _save_message(db: AsyncSession, current_user: Optional[User], message_text: str, risk_level: str,
+                        red_flags: List[str], explanation: str, rules_score: int, fingerprint: str) -> Optional[str]:
+    """Persist one checked message; returns its id, or None if the write failed (non-critical)"""
+    try:
+        message_record = Message(
+            user_id=current_user.id if current_user else None,
+            message_text=message_text,
+            risk_level=risk_level,
+            confidence=1.0, # Rules are deterministic, so confidence is 100% in the rule match
+            red_flags=red_flags,
+            explanation=explanation,
+            ai_prediction="N/A", # Explicitly not using AI prediction
+            rules_score=rules_score,
+            fingerprint=fingerprint
+        )
+        
+        db.add(message_record)
+        await db.commit()
+        await db.refresh(message_record)
+        return str(message_record.id)
+    except Exception as e:
+        print(f"Database write failed (non-critical): {e}")
+        await db.rollback()
+        return None
+
+
+def _near_duplicate_analysis(message_text: str, risk_level: str, red_flags: List[str]) -> Optional[dict]:
+    """
+    A recent LLM analysis of a near-identical message with the same rules
+    verdict and identifiers that pair up, adapted to this one (None if there
+    is none)
+    """
+    index = get_near_duplicate_index()
+    match = index.lookup(message_text, risk_level, red_flags)
+    if match is None:
+        return None
+    return index.adapt(match, message_text)
+
+
+def _sse(event: str, data: dict) -> str:
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.post("/message", response_model=RiskCheckResult)
 async def check_message(
     message_data: MessageCheck,
     request: Request,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
     Check if a message is a scam.
     RISK SOURCE: Rules Engine (Deterministic Patterns)
-    EXPLANATION SOURCE: AI (Language Model)
+    EXPLANATION SOURCE: tiered - rule templates when the rules are decisive,
+    plus local classifier evidence when it confidently agrees; AI (Language
+    Model) only when both are uncertain or disagree, or ai_explanation is set.
+    With async_explanation the LLM part runs as a background job instead.
     """
     
     message_text = message_data.message
     fingerprint = get_fingerprint(request)
     
     # STEP 1: Rule-Based Analysis (Source of Truth for Risk)
-    rules_engine = RulesEngine()
-    red_flags, rules_score = rules_engine.check_message(message_text)
-    risk_level = rules_engine.get_risk_level(rules_score)
-    
-    # STEP 2: AI Analysis (Explanation Only)
-    ai_service = get_ai_service()
-    # We ignore AI's scam_probability/prediction for risk assignment
-    ai_result = await ai_service.analyze_message(message_text)
+    rules_engine = get_rules_engine()
+    rules_result = await get_executor().run(evaluate_message, message_text, size=len(message_text))
+    red_flags = list(rules_result.red_flags)
+    rules_score = rules_result.risk_score
+    risk_level = rules_result.risk_level
     
-    # Combine red flags (AI might find semantic ones)
-    all_red_flags = list(set(ai_result.get("red_flags", []) + red_flags))
+    # STEP 2: Local classifier, when the rules are not decisive or for explanation evidence
+    tiers = get_tiered_inference()
+    needs_classifier = risk_level in ("High", "Medium") or not tiers.rules_decisive(rules_score)
+    scam_probability, evidence_terms = (await _classifier_evidence([message_text], [needs_classifier]))[0]
+    decision = tiers.decide(rules_score, risk_level, scam_probability, llm_requested=message_data.ai_explanation)
     
-    # Use AI explanation if available, otherwise fallback to template
-    explanation = ai_result.get("explanation_en", 
-        rules_engine.generate_explanation(message_text, risk_level, all_red_flags)
+    # Local explanation (no network): fired rules + classifier evidence
+    all_red_flags = red_flags
+    explanation = rules_engine.generate_explanation(
+        message_text, risk_level, red_flags, evidence_terms=evidence_terms
     )
-    explanation_bn = ai_result.get("explanation_bn",
-        rules_engine.generate_explanation_bn(message_text, risk_level, all_red_flags)
+    explanation_bn = rules_engine.generate_explanation_bn(
+        message_text, risk_level, red_flags, evidence_terms=evidence_terms
     )
     
-    # Try to save to database (non-blocking)
-    message_id = None
-    try:
-        message_record = Message(
-            user_id=current_user.id if current_user else None,
-            message_text=message_text,
-            risk_level=risk_level,
-            confidence=1.0, # Rules are deterministic, so confidence is 100% in the rule match
-            red_flags=all_red_flags,
-            explanation=explanation,
-            ai_prediction="N/A", # Explicitly not using AI prediction
-            rules_score=rules_score,
-            fingerprint=fingerprint
-        )
+    # STEP 3: AI Analysis (Explanation Only), when the cheaper tiers were not enough.
+    # A near-duplicate of a recent LLM analysis (same campaign template) reuses it.
+    # In async mode the request does not wait for it: a job fills it in after the response,
+    # but only while the LLM can take calls (configured, breaker letting calls through);
+    # otherwise a job could only fail, so the local explanation is returned right away.
+    ai_service = get_ai_service()
+    reused = _near_duplicate_analysis(message_text, risk_level, red_flags) if decision.tier == "llm" else None
+    needs_llm = decision.tier == "llm" and reused is None
+    explain_later = (
+        needs_llm and message_data.async_explanation
+        and ai_service.is_available and ai_service.breaker.available()
+    )
+    if reused is not None:
+        all_red_flags = reused["red_flags"]
+        explanation = reused.get("explanation_en", explanation)
+        explanation_bn = reused.get("explanation_bn", explanation_bn)
+    elif needs_llm and not message_data.async_explanation:
+        # We ignore AI's scam_probability/prediction for risk assignment
+        priority = await llm_priority(db, current_user)
+        ai_result = await ai_service.analyze_message(message_text, priority=priority)
         
-        db.add(message_record)
-        await db.commit()
-        await db.refresh(message_record)
-        message_id = str(message_record.id)
-    except Exception as e:
-        print(f"Database write failed (non-critical): {e}")
-        await db.rollback()
+        # Unavailable, failed, past its deadline, shed or circuit-broken: keep the local explanation
+        if ai_result.get("provider") != "fallback":
+            # Combine red flags (AI might find semantic ones)
+            all_red_flags = list(set(ai_result.get("red_flags", []) + red_flags))
+            
+            explanation = ai_result.get("explanation_en", explanation)
+            explanation_bn = ai_result.get("explanation_bn", explanation_bn)
+            get_near_duplicate_index().add(message_text, ai_result, risk_level, red_flags)
+    
+    # Try to save to database (non-blocking)
+    message_id = await _save_message(
+        db, current_user, message_text, risk_level, all_red_flags, explanation, rules_score, fingerprint
+    )
+    
+    job_id = None
+    explanation_status = "complete"
+    if explain_later:
+        # No message row, or a full queue (backpressure): the local explanation stands
+        job_id = await get_explanation_queue().submit(message_id) if message_id else None
+        explanation_status = "pending" if job_id else "rejected"
+    
+    # Shadow-score a sample with the candidate classifier after the response is sent
+    shadow_scorer = get_shadow_scorer()
+    if shadow_scorer.should_sample():
+        background_tasks.add_task(shadow_scorer.score, message_text, message_id)
     
     return RiskCheckResult(
         risk_level=risk_level,
@@ -88,9 +202,230 @@ async def check_message(
         ai_prediction="N/A",
         ai_confidence=0.0, # AI probability hidden/unused
         rules_score=rules_score,
-        message_id=message_id
+        message_id=message_id,
+        job_id=job_id,
+        explanation_status=explanation_status
     )
 
+@router.get("/result/{message_id}", response_model=RiskCheckResult)
+async def get_check_result(
+    message_id: uuid.UUID,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """
+    A checked message with its current explanation. Poll this after an
+    async_explanation check until explanation_status is done or failed.
+    """
+    message = await db.get(Message, message_id)
+    # Same visibility as /history: the owner, or the same device for anonymous checks
+    if message is None or (
+        message.user_id != (current_user.id if current_user else None)
+        or (message.user_id is None and message.fingerprint != get_fingerprint(request))
+    ):
+        raise HTTPException(status_code=404, detail="Result not found")
+    
+    job = await get_explanation_queue().job_for_message(message.id)
+    red_flags = message.red_flags or []
+    explanation_bn = job.explanation_bn if job and job.status == "done" else None
+    if not explanation_bn:
+        explanation_bn = get_rules_engine().generate_explanation_bn(
+            message.message_text, message.risk_level, red_flags
+        )
+    
+    return RiskCheckResult(
+        risk_level=message.risk_level,
+        confidence=message.confidence,
+        red_flags=red_flags,
+        explanation=message.explanation or "",
+        explanation_bn=explanation_bn,
+        ai_prediction=message.ai_prediction,
+        ai_confidence=0.0,
+        rules_score=message.rules_score,
+        message_id=str(message.id),
+        job_id=str(job.id) if job else None,
+        explanation_status=job.status if job else "complete"
+    )
+
+@router.post("/message/stream")
+async def check_message_stream(
+    message_data: MessageCheck,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """
+    /check/message as Server-Sent Events:
+      verdict      {risk_level, red_flags, rules_score} straight from the rules
+      explanation  {lang: "en"|"bn", delta} explanation text as it is written
+                   (LLM tokens on the llm tier, the local templates otherwise,
+                   including when the LLM falls back; with replace=true the
+                   delta replaces the text streamed so far)
+      done         final RiskCheckResult, with the persisted message_id; its
+                   explanation replaces the streamed one (e.g. after an LLM fallback)
+    """
+    message_text = message_data.message
+    fingerprint = get_fingerprint(request)
+    
+    # Rules first: the verdict goes out before any classifier or LLM work
+    rules_engine = get_rules_engine()
+    rules_result = await get_executor().run(evaluate_message, message_text, size=len(message_text))
+    red_flags = list(rules_result.red_flags)
+    rules_score = rules_result.risk_score
+    risk_level = rules_result.risk_level
+    
+    async def events():
+        yield _sse("verdict", {"risk_level": risk_level, "red_flags": red_flags, "rules_score": rules_score})
+        
+        tiers = get_tiered_inference()
+        needs_classifier = risk_level in ("High", "Medium") or not tiers.rules_decisive(rules_score)
+        scam_probability, evidence_terms = (await _classifier_evidence([message_text], [needs_classifier]))[0]
+        decision = tiers.decide(rules_score, risk_level, scam_probability, llm_requested=message_data.ai_explanation)
+        
+        all_red_flags = red_flags
+        explanation = rules_engine.generate_explanation(
+            message_text, risk_level, red_flags, evidence_terms=evidence_terms
+        )
+        explanation_bn = rules_engine.generate_explanation_bn(
+            message_text, risk_level, red_flags, evidence_terms=evidence_terms
+        )
+        
+        reused = _near_duplicate_analysis(message_text, risk_level, red_flags) if decision.tier == "llm" else None
+        if reused is not None:
+            all_red_flags = reused["red_flags"]
+            explanation = reused.get("explanation_en", explanation)
+            explanation_bn = reused.get("explanation_bn", explanation_bn)
+            yield _sse("explanation", {"lang": "en", "delta": explanation})
+            yield _sse("explanation", {"lang": "bn", "delta": explanation_bn})
+        elif decision.tier == "llm":
+            async with AsyncSessionLocal() as db:
+                priority = await llm_priority(db, current_user)
+            streamed = False
+            async for event in get_ai_service().stream_message(message_text, priority=priority):
+                if event["type"] == "delta":
+                    lang = "en" if event["field"] == "explanation_en" else "bn"
+                    yield _sse("explanation", {"lang": lang, "delta": event["text"]})
+                    streamed = True
+                    continue
+                ai_result = event["result"]
+                if ai_result.get("provider") != "fallback":
+                    all_red_flags = list(set(ai_result.get("red_flags", []) + red_flags))
+                    explanation = ai_result.get("explanation_en", explanation)
+                    explanation_bn = ai_result.get("explanation_bn", explanation_bn)
+                    get_near_duplicate_index().add(message_text, ai_result, risk_level, red_flags)
+                else:
+                    # LLM unavailable or failed: send the local explanation, replacing
+                    # any partial LLM text already streamed
+                    yield _sse("explanation", {"lang": "en", "delta": explanation, "replace": streamed})
+                    yield _sse("explanation", {"lang": "bn", "delta": explanation_bn, "replace": streamed})
+        else:
+            yield _sse("explanation", {"lang": "en", "delta": explanation})
+            yield _sse("explanation", {"lang": "bn", "delta": explanation_bn})
+        
+        # The request's session may already be closed while streaming: use a fresh one
+        async with AsyncSessionLocal() as db:
+            message_id = await _save_message(
+                db, current_user, message_text, risk_level, all_red_flags, explanation, rules_score, fingerprint
+            )
+        
+        shadow_scorer = get_shadow_scorer()
+        if shadow_scorer.should_sample():
+            background_tasks.add_task(shadow_scorer.score, message_text, message_id)
+        
+        yield _sse("done", RiskCheckResult(
+            risk_level=risk_level,
+            confidence=1.0,
+            red_flags=all_red_flags,
+            explanation=explanation,
+            explanation_bn=explanation_bn,
+            ai_prediction="N/A",
+            ai_confidence=0.0,
+            rules_score=rules_score,
+            message_id=message_id
+        ).model_dump())
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # No proxy buffering or caching: each event should reach the client as it is sent
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/batch", response_model=BatchCheckResult)
+async def check_batch(
+    batch_data: BatchMessageCheck,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Check a batch of messages (e.g. partner SMS dumps). Signed-in users only:
+    every message is scored and stored, up to CHECK_BATCH_MAX_MESSAGES per request.
+    RISK SOURCE: Rules Engine (Deterministic Patterns)
+    EXPLANATION SOURCE: Rule templates + local classifier evidence (no per-message LLM round-trip)
+    """
+    
+    fingerprint = get_fingerprint(request)
+    user_id = current_user.id
+    created_at = datetime.utcnow()
+    
+    # Rule-Based Analysis for the whole batch in one call
+    rules_engine = get_rules_engine()
+    rules_results = await get_executor().run(
+        evaluate_messages, batch_data.messages, size=sum(len(text) for text in batch_data.messages)
+    )
+    
+    evidence = await _classifier_evidence(
+        batch_data.messages, [result.risk_level in ("High", "Medium") for result in rules_results]
+    )
+    
+    rows = []
+    results = []
+    for message_text, rules_result, (_, terms) in zip(batch_data.messages, rules_results, evidence):
+        message_id = uuid.uuid4()
+        red_flags = list(rules_result.red_flags)
+        risk_level = rules_result.risk_level
+        explanation = rules_engine.generate_explanation(message_text, risk_level, red_flags, evidence_terms=terms)
+        explanation_bn = rules_engine.generate_explanation_bn(message_text, risk_level, red_flags, evidence_terms=terms)
+        
+        rows.append({
+            "id": message_id,
+            "user_id": user_id,
+            "message_text": message_text,
+            "risk_level": risk_level,
+            "confidence": 1.0,
+            "red_flags": red_flags,
+            "explanation": explanation,
+            "ai_prediction": "N/A",
+            "rules_score": rules_result.risk_score,
+            "fingerprint": fingerprint,
+            "created_at": created_at
+        })
+        results.append(RiskCheckResult(
+            risk_level=risk_level,
+            confidence=1.0,
+            red_flags=red_flags,
+            explanation=explanation,
+            explanation_bn=explanation_bn,
+            ai_prediction="N/A",
+            ai_confidence=0.0,
+            rules_score=rules_result.risk_score,
+            message_id=str(message_id)
+        ))
+    
+    # One bulk insert for the batch instead of a commit/refresh per message
+    try:
+        await db.execute(insert(Message), rows)
+        await db.commit()
+    except Exception as e:
+        print(f"Batch database write failed (non-critical): {e}")
+        await db.rollback()
+        for result in results:
+            result.message_id = None
+    
+    return BatchCheckResult(total=len(results), results=results)
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint"""
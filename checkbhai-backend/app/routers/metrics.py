@@ -0,0 +1,58 @@
+"""
+Metrics routes - per-worker performance counters
+Cheap in-process metrics (values are per uvicorn worker)
+"""
+
+from fastapi import APIRouter
+
+from app.metrics import metrics
+from app.near_duplicate import get_near_duplicate_index
+from app.explanation_jobs import get_explanation_queue
+from app.services.ai_service import get_ai_service
+from app.rules_engine import get_rules_engine
+from app.tiered_inference import get_tiered_inference
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/")
+async def get_metrics():
+    """All counters and latency histograms for this worker"""
+    return metrics.snapshot()
+
+@router.get("/rules")
+async def get_rules_metrics():
+    """
+    Rules engine metrics: per-rule hits and timings, per-stage timings,
+    per-message latency, and rules that have never fired.
+    """
+    return get_rules_engine().metrics_snapshot()
+
+
+@router.get("/tiers")
+async def get_tier_metrics():
+    """
+    Tiered /check/message pipeline: thresholds and how much traffic stopped
+    at the rules, the local classifier and the LLM (with reasons).
+    """
+    return get_tiered_inference().stats()
+
+
+@router.get("/explanations")
+async def get_explanation_metrics():
+    """Async explanation jobs: queue depth, busy workers, outcomes and wait/run times"""
+    return get_explanation_queue().stats()
+
+
+@router.get("/llm")
+async def get_llm_metrics():
+    """LLM scheduler: slots in flight, queue depth, wait times and shed calls per priority"""
+    return get_ai_service().scheduler.stats()
+
+
+@router.get("/near-duplicates")
+async def get_near_duplicate_metrics():
+    """
+    Near-duplicate reuse of LLM explanations: similarity threshold, index
+    size, hit rate (LLM calls saved) and the similarity of hits.
+    """
+    return get_near_duplicate_index().stats()
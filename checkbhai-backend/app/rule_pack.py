@@ -0,0 +1,150 @@
+"""
+CheckBhai Rule Packs - Declarative rules compiled for the Rules Engine
+Keywords, regexes, weights and explanation templates live in a JSON data file
+(app/data/rule_pack.json by default) so they can be tuned without a redeploy.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+
+from app.keyword_matcher import KeywordMatcher, TokenMatcher
+from app.text_normalizer import normalize_text
+
+DEFAULT_RULE_PACK_PATH = os.getenv(
+    "RULE_PACK_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "rule_pack.json")
+)
+
+# "token": whole words and phrases; "substring": raw substring matching
+MATCHERS = {
+    "token": TokenMatcher,
+    "substring": KeywordMatcher
+}
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """
+    One scoring rule. It fires when every condition it declares holds:
+    its own keywords hit, its pattern matches (and the captured number passes
+    the thresholds), and every required keyword set hits.
+    """
+    id: str
+    version: int
+    weight: int
+    flag: str
+    has_keywords: bool = False
+    pattern: Optional["re.Pattern"] = None
+    number_group: Optional[int] = None
+    greater_than: Optional[float] = None
+    less_than: Optional[float] = None
+    requires: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class CompiledRulePack:
+    """Immutable, ready-to-evaluate rule pack; swapped as a whole on reload"""
+    version: str
+    rules: Tuple[CompiledRule, ...]
+    keyword_matcher: Union[TokenMatcher, KeywordMatcher]
+    risk_levels: Tuple[Tuple[str, int], ...]
+    max_score: int
+    explanations: Dict[str, Dict[str, str]]
+    source: Optional[str] = None
+
+    def get_risk_level(self, risk_score: int) -> str:
+        """Convert risk score to risk level using the pack thresholds"""
+        for level, min_score in self.risk_levels:
+            if risk_score >= min_score:
+                return level
+        return "Low"
+
+
+def compile_rule_pack(data: Dict, source: Optional[str] = None) -> CompiledRulePack:
+    """Validate a rule pack document and compile it; raises ValueError if invalid"""
+    try:
+        version = str(data["version"])
+        match_mode = data.get("match_mode", "token")
+        if match_mode not in MATCHERS:
+            raise ValueError(f"unknown match_mode '{match_mode}'")
+        keyword_dicts = {name: words for name, words in data.get("keyword_sets", {}).items()}
+        rules = []
+        seen = set()
+
+        for spec in data["rules"]:
+            rule_id = spec["id"]
+            if rule_id in seen or rule_id in keyword_dicts:
+                raise ValueError(f"duplicate rule or keyword set id '{rule_id}'")
+            seen.add(rule_id)
+
+            if "keywords" in spec:
+                keyword_dicts[rule_id] = spec["keywords"]
+
+            pattern = None
+            if "pattern" in spec:
+                flags = re.IGNORECASE if spec.get("ignore_case") else 0
+                # Patterns run over NFC-normalized text
+                pattern = re.compile(unicodedata.normalize("NFC", spec["pattern"]), flags)
+
+            rules.append(CompiledRule(
+                id=rule_id,
+                version=int(spec.get("version", 1)),
+                weight=int(spec["weight"]),
+                flag=spec["flag"],
+                has_keywords="keywords" in spec,
+                pattern=pattern,
+                number_group=spec.get("number_group"),
+                greater_than=spec.get("greater_than"),
+                less_than=spec.get("less_than"),
+                requires=tuple(spec.get("requires", ()))
+            ))
+
+        for rule in rules:
+            missing = [name for name in rule.requires if name not in keyword_dicts]
+            if missing:
+                raise ValueError(f"rule '{rule.id}' requires unknown keyword sets {missing}")
+            if not (rule.has_keywords or rule.pattern or rule.requires):
+                raise ValueError(f"rule '{rule.id}' has no conditions")
+
+        risk_levels = tuple(sorted(
+            ((level, int(score)) for level, score in data.get("risk_levels", {}).items()),
+            key=lambda item: item[1],
+            reverse=True
+        ))
+
+        return CompiledRulePack(
+            version=version,
+            rules=tuple(rules),
+            keyword_matcher=MATCHERS[match_mode].from_keyword_dicts(_normalize_keywords(keyword_dicts)),
+            risk_levels=risk_levels,
+            max_score=int(data.get("max_score", 100)),
+            explanations=data.get("explanations", {}),
+            source=source
+        )
+    except (KeyError, TypeError, re.error) as e:
+        raise ValueError(f"Invalid rule pack ({source or 'inline'}): {e}") from e
+
+
+def _normalize_keywords(keyword_dicts: Dict) -> Dict:
+    """Keywords get the same canonical form as the text they are matched against"""
+    return {
+        name: {language: [normalize_text(word) for word in words] for language, words in languages.items()}
+        for name, languages in keyword_dicts.items()
+    }
+
+
+def load_rule_pack(path: str = DEFAULT_RULE_PACK_PATH) -> CompiledRulePack:
+    """Read and compile a rule pack file"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return compile_rule_pack(data, source=path)
+
+
+def file_stamp(path: str) -> Tuple[float, int]:
+    """Cheap change detector for a pack file (mtime, size)"""
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
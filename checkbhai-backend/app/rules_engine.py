@@ -3,158 +3,348 @@ CheckBhai Rules Engine - Pattern-based risk detection
 Detects suspicious patterns across English, Bangla, and Banglish
 """
 
+import asyncio
+import logging
+import multiprocessing
+import os
 import re
-from typing import List, Tuple
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.metrics import Counter, Histogram, metrics
+from app.rule_pack import CompiledRulePack, DEFAULT_RULE_PACK_PATH, file_stamp, load_rule_pack
+from app.text_normalizer import normalize_text
+
+logger = logging.getLogger("RulesEngine")
+
+# Seconds between rule pack file checks (0 disables hot reload)
+RULE_PACK_RELOAD_INTERVAL = float(os.getenv("RULE_PACK_RELOAD_INTERVAL", "30"))
+
+# Per-rule hit counters and stage timings (a few perf_counter calls per message)
+RULES_METRICS_ENABLED = os.getenv("RULES_METRICS_ENABLED", "true").lower() == "true"
+
+# Timing stages reported under rules.stage_ms.<stage>
+RULE_STAGES = ("normalize", "keyword_scan", "regex", "number_parse")
+
+_messages_counter = metrics.counter("rules.messages")
+_message_histogram = metrics.histogram("rules.message_ms")
+_stage_histograms = {stage: metrics.histogram(f"rules.stage_ms.{stage}") for stage in RULE_STAGES}
+
+
+@lru_cache(maxsize=None)
+def _rule_metrics(rule_id: str) -> Tuple[Counter, Histogram]:
+    """Cached (hits counter, latency histogram) handles for one rule id"""
+    return metrics.counter(f"rules.hits.{rule_id}"), metrics.histogram(f"rules.rule_ms.{rule_id}")
+
+
+class RuleMatch(NamedTuple):
+    """Span of the normalized text that made a rule fire"""
+    rule: str
+    start: int
+    end: int
+    text: str
+
+    @classmethod
+    def from_regex(cls, rule: str, match: "re.Match") -> "RuleMatch":
+        return cls(rule, match.start(), match.end(), match.group(0))
+
+
+@dataclass(frozen=True)
+class RuleResult:
+    """Immutable outcome of one rules evaluation"""
+    red_flags: Tuple[str, ...]
+    risk_score: int
+    risk_level: str
+    matches: Tuple[RuleMatch, ...] = ()
+    pack_version: Optional[str] = None
+
 
 class RulesEngine:
-    """Rule-based risk detection engine"""
-    
-    # Pressure keywords in multiple languages
-    URGENCY_KEYWORDS = {
-        'english': ['urgent', 'immediately', 'now', 'today', 'hurry', 'limited', 'last chance', 
-                   'expire', 'within 24 hours', 'only', 'slots left', 'stock left'],
-        'bangla': ['taratari', 'ajo', 'ekhoni', 'ekhon', 'shesh', 'limited'],
-        'bangla_unicode': ['তাড়াতাড়ি', 'আজ', 'এখনই', 'এখন', 'শেষ', 'দ্রুত']
-    }
-    
-    # Payment request keywords
-    PAYMENT_KEYWORDS = {
-        'english': ['pay', 'send money', 'bkash', 'rocket', 'nagad', 'bank transfer', 
-                   'advance', 'fee', 'taka pathao', 'payment'],
-        'bangla': ['taka', 'pathao', 'bkash', 'rocket', 'advance', 'fee', 'taka den'],
-        'bangla_unicode': ['টাকা', 'পাঠাও', 'বিকাশ', 'রকেট', 'নগদ', 'ফি']
-    }
-    
-    # Unrealistic promise keywords
-    OVERPROMISE_KEYWORDS = {
-        'english': ['guarantee', '100%', 'guaranteed', 'confirm', 'sure', 'certain', 
-                   'no risk', 'risk free', 'easy money'],
-        'bangla': ['guarantee', 'confirm', 'nischit', 'pakka', 'guarantee'],
-        'bangla_unicode': ['গ্যারান্টি', 'নিশ্চিত', 'পাক্কা', 'কনফার্ম']
-    }
-    
-    # Suspicious patterns
-    SUSPICIOUS_PATTERNS = {
-        'too_good_prices': r'\b(only|matro|মাত্র)\s*(\d+)\s*(taka|টাকা|BDT)',
-        'percentage': r'(\d+)%',
-        'large_numbers': r'(\d+)\s*(lakh|লাখ|thousand|হাজার)',
-        'job_fees': r'(registration|visa|processing)\s*(fee|ফি)',
-        'personal_info_request': r'(PIN|password|OTP|পাসওয়ার্ড|পিন)'
-    }
-    
-    def __init__(self):
-        self.red_flags = []
-    
+    """
+    Rule-based risk detection engine.
+    Rules come from a compiled rule pack. Each evaluation reads the current
+    pack reference once, so a hot reload never affects in-flight checks.
+    """
+
+    def __init__(self, pack_path: str = DEFAULT_RULE_PACK_PATH, metrics_enabled: bool = RULES_METRICS_ENABLED):
+        self.pack_path = pack_path
+        self._pack = load_rule_pack(pack_path)
+        self._pack_stamp = file_stamp(pack_path)
+        self._reload_lock = threading.Lock()
+        self.metrics_enabled = metrics_enabled
+
+    @property
+    def pack(self) -> CompiledRulePack:
+        return self._pack
+
+    def reload_if_changed(self) -> bool:
+        """
+        Recompile the rule pack if its file changed and swap it in atomically.
+        An invalid pack is logged and the current one is kept.
+        """
+        with self._reload_lock:
+            try:
+                stamp = file_stamp(self.pack_path)
+                if stamp == self._pack_stamp:
+                    return False
+                pack = load_rule_pack(self.pack_path)
+            except (OSError, ValueError) as e:
+                logger.error(f"Rule pack reload failed, keeping version {self._pack.version}: {e}")
+                return False
+
+            self._pack = pack
+            self._pack_stamp = stamp
+            logger.info(f"Rule pack reloaded: version {pack.version}")
+            return True
+
     def check_message(self, text: str) -> Tuple[List[str], int]:
         """
         Analyze message for suspicious patterns
         Returns: (red_flags, risk_score)
         """
-        self.red_flags = []
+        result = self.evaluate(text)
+        return list(result.red_flags), result.risk_score
+
+    def check_messages(self, texts: List[str]) -> List[RuleResult]:
+        """
+        Analyze a batch of messages.
+        SMS dumps repeat the same templates heavily, so each distinct
+        canonical text is evaluated once and its immutable result shared.
+        """
+        pack = self._pack
+        started = time.perf_counter()
+        canonical_texts = [normalize_text(text) for text in texts]
+        if self.metrics_enabled:
+            _stage_histograms["normalize"].observe((time.perf_counter() - started) * 1000)
+        results = {}
+        for canonical in canonical_texts:
+            if canonical not in results:
+                results[canonical] = self._evaluate_canonical(canonical, pack)
+        return [results[canonical] for canonical in canonical_texts]
+
+    def evaluate(self, text: str) -> RuleResult:
+        """
+        Analyze message for suspicious patterns.
+        Keeps no per-call state on the engine, so one instance can be shared
+        across requests and threads.
+        """
+        started = time.perf_counter()
+        canonical = normalize_text(text)
+        if self.metrics_enabled:
+            _stage_histograms["normalize"].observe((time.perf_counter() - started) * 1000)
+        return self._evaluate_canonical(canonical, self._pack)
+
+    def _evaluate_canonical(self, text: str, pack: CompiledRulePack) -> RuleResult:
+        """Run every pack rule over already-normalized text (spans index this text)"""
+        red_flags = []
+        matches = []
+        fired = []
         risk_score = 0
-        text_lower = text.lower()
-        
-        # Check for pressure tactics
-        if self._contains_keywords(text_lower, self.URGENCY_KEYWORDS):
-            self.red_flags.append("⚠️ Uses pressure tactics or artificial urgency")
-            risk_score += 25
-        
-        # Check for payment requests
-        if self._contains_keywords(text_lower, self.PAYMENT_KEYWORDS):
-            self.red_flags.append("💰 Requests advance or direct payment")
-            risk_score += 30
-        
-        # Check for unrealistic promises
-        if self._contains_keywords(text_lower, self.OVERPROMISE_KEYWORDS):
-            self.red_flags.append("🎯 Makes unrealistic guarantees")
-            risk_score += 25
-        
-        # Check for sensitive info phishing
-        if re.search(self.SUSPICIOUS_PATTERNS['personal_info_request'], text, re.IGNORECASE):
-            self.red_flags.append("🔐 Requests sensitive personal information (PIN/OTP)")
-            risk_score += 60
-        
-        # Check for job/visa fees
-        if re.search(self.SUSPICIOUS_PATTERNS['job_fees'], text, re.IGNORECASE):
-            self.red_flags.append("📋 Charges fees for job or visa services")
-            risk_score += 40
-        
-        # Check for suspiciously low prices
-        price_match = re.search(self.SUSPICIOUS_PATTERNS['too_good_prices'], text, re.IGNORECASE)
-        if price_match:
-            try:
-                amount = int(price_match.group(2))
-                if amount < 20000 and any(word in text_lower for word in ['iphone', 'macbook', 'laptop', 'gold', 'স্বর্ণ']):
-                    self.red_flags.append("💸 Suspiciously low price for premium items")
-                    risk_score += 30
-            except:
-                pass
-        
-        # Check for high percentage returns
-        percent_match = re.search(self.SUSPICIOUS_PATTERNS['percentage'], text)
-        if percent_match:
-            try:
-                percentage = int(percent_match.group(1))
-                if percentage > 50:
-                    self.red_flags.append("📈 Promises unrealistic returns")
-                    risk_score += 30
-            except:
-                pass
-        
-        # Check for prize/lottery patterns
-        if any(word in text_lower for word in ['lottery', 'লটারি', 'prize', 'won', 'jitechen', 'জিতেছেন']):
-            if any(word in text_lower for word in ['fee', 'claim', 'ফি', 'processing']):
-                self.red_flags.append("🎰 Unsolicited prize claim requiring fees")
-                risk_score += 50
-        
-        # Cap risk score at 100
-        risk_score = min(risk_score, 100)
-        
-        return self.red_flags, risk_score
-    
-    def _contains_keywords(self, text: str, keyword_dict: dict) -> bool:
-        """Check if text contains any keywords from the dictionary"""
-        for lang, keywords in keyword_dict.items():
-            if any(keyword in text for keyword in keywords):
-                return True
-        return False
-    
+        clock = time.perf_counter
+        started = clock()
+        regex_seconds = 0.0
+        number_seconds = 0.0
+        rule_seconds = {}
+
+        keyword_hits = {}
+        for hit in pack.keyword_matcher.find_all(text):
+            keyword_hits.setdefault(hit.category, []).append(
+                RuleMatch(hit.category, hit.start, hit.end, hit.keyword)
+            )
+        keyword_seconds = clock() - started
+
+        for rule in pack.rules:
+            if rule.has_keywords and rule.id not in keyword_hits:
+                continue
+            if any(name not in keyword_hits for name in rule.requires):
+                continue
+
+            pattern_match = None
+            if rule.pattern is not None:
+                rule_started = clock()
+                pattern_match = rule.pattern.search(text)
+                searched = clock()
+                regex_seconds += searched - rule_started
+                in_range = True
+                if pattern_match and rule.number_group is not None:
+                    in_range = self._number_in_range(rule, pattern_match)
+                    number_seconds += clock() - searched
+                rule_seconds[rule.id] = clock() - rule_started
+                if not pattern_match or not in_range:
+                    continue
+
+            red_flags.append(rule.flag)
+            fired.append(rule.id)
+            risk_score += rule.weight
+            if rule.has_keywords:
+                matches.extend(keyword_hits[rule.id])
+            if pattern_match:
+                matches.append(RuleMatch.from_regex(rule.id, pattern_match))
+            for name in rule.requires:
+                matches.extend(keyword_hits[name])
+
+        # Cap risk score
+        risk_score = min(risk_score, pack.max_score)
+
+        result = RuleResult(
+            red_flags=tuple(red_flags),
+            risk_score=risk_score,
+            risk_level=pack.get_risk_level(risk_score),
+            matches=tuple(dict.fromkeys(matches)),
+            pack_version=pack.version
+        )
+
+        if self.metrics_enabled:
+            self._record_metrics(fired, clock() - started, keyword_seconds,
+                                 regex_seconds, number_seconds, rule_seconds)
+        return result
+
+    @staticmethod
+    def _record_metrics(fired: List[str], total_seconds: float,
+                        keyword_seconds: float, regex_seconds: float, number_seconds: float,
+                        rule_seconds: dict):
+        """Per-rule hits, per-stage timings and per-message latency"""
+        _messages_counter.inc()
+        _message_histogram.observe(total_seconds * 1000)
+        _stage_histograms["keyword_scan"].observe(keyword_seconds * 1000)
+        _stage_histograms["regex"].observe(regex_seconds * 1000)
+        _stage_histograms["number_parse"].observe(number_seconds * 1000)
+        for rule_id, seconds in rule_seconds.items():
+            _rule_metrics(rule_id)[1].observe(seconds * 1000)
+        for rule_id in fired:
+            _rule_metrics(rule_id)[0].inc()
+
+    def metrics_snapshot(self) -> dict:
+        """Rules metrics for the current pack, including rules that never fired"""
+        pack = self._pack
+        snapshot = metrics.snapshot("rules.")
+        counters = snapshot["counters"]
+        histograms = snapshot["histograms"]
+        rules = {}
+        for rule in pack.rules:
+            rule_timing = histograms.get(f"rules.rule_ms.{rule.id}")
+            rules[rule.id] = {
+                "version": rule.version,
+                "weight": rule.weight,
+                "hits": counters.get(f"rules.hits.{rule.id}", 0),
+                "mean_ms": rule_timing["mean"] if rule_timing else None,
+                "p99_ms": rule_timing["p99"] if rule_timing else None
+            }
+        return {
+            "enabled": self.metrics_enabled,
+            "pack_version": pack.version,
+            "messages": counters.get("rules.messages", 0),
+            "message_ms": histograms.get("rules.message_ms"),
+            "stage_ms": {stage: histograms.get(f"rules.stage_ms.{stage}") for stage in RULE_STAGES},
+            "rules": rules,
+            "never_fired": [rule_id for rule_id, stats in rules.items() if not stats["hits"]]
+        }
+
+    @staticmethod
+    def _number_in_range(rule, pattern_match: "re.Match") -> bool:
+        """Check the captured number (prices, percentages) against rule thresholds"""
+        try:
+            value = int(pattern_match.group(rule.number_group))
+        except (IndexError, TypeError, ValueError):
+            return False
+        if rule.greater_than is not None and not value > rule.greater_than:
+            return False
+        if rule.less_than is not None and not value < rule.less_than:
+            return False
+        return True
+
     def get_risk_level(self, risk_score: int) -> str:
         """Convert risk score to risk level"""
-        if risk_score >= 60:
-            return "High"
-        elif risk_score >= 30:
-            return "Medium"
-        else:
-            return "Low"
-    
-    def generate_explanation(self, text: str, risk_level: str, red_flags: List[str], ai_confidence: float = None) -> str:
-        """Generate evidence-based explanation in English"""
-        if risk_level == "High":
-            explanation = "⚠️ **High Risk Pattern Detected.** This message matches multiple patterns often associated with suspicious activity. "
-        elif risk_level == "Medium":
-            explanation = "⚡ **Potential Risk.** This message contains some suspicious elements. "
-        else:
-            explanation = "✅ **Low Risk.** This message does not show obvious suspicious patterns. "
-        
+        return self._pack.get_risk_level(risk_score)
+
+    def generate_explanation(self, text: str, risk_level: str, red_flags: List[str], ai_confidence: float = None,
+                             evidence_terms: Optional[List[str]] = None) -> str:
+        """
+        Generate evidence-based explanation in English: the fired rules plus,
+        for Medium/High risk, the words the local classifier weighed most
+        """
+        templates = self._pack.explanations["en"]
+        explanation = templates.get(risk_level, templates["Low"])
+
         if red_flags:
-            explanation += f"Identified flags: {', '.join(red_flags)}. "
-        
+            explanation += templates["flags"].format(flags=', '.join(red_flags))
+
         if risk_level in ["High", "Medium"]:
-            explanation += "Always verify the sender's identity through official channels before sharing money or personal data."
-        
+            explanation += self._terms_sentence(templates, evidence_terms)
+            explanation += templates["advice"]
+
         return explanation
 
-    def generate_explanation_bn(self, text: str, risk_level: str, red_flags: List[str]) -> str:
+    def generate_explanation_bn(self, text: str, risk_level: str, red_flags: List[str],
+                                evidence_terms: Optional[List[str]] = None) -> str:
         """Generate evidence-based explanation in Bangla"""
-        if risk_level == "High":
-            explanation = "⚠️ **উচ্চ ঝুঁকি সনাক্ত করা হয়েছে!** এই বার্তাটিতে সন্দেহজনক কার্যক্রমের একাধিক লক্ষণ পাওয়া গেছে। "
-        elif risk_level == "Medium":
-            explanation = "⚡ **ঝুঁকি থাকতে পারে।** এই বার্তাটিতে কিছু সন্দেহজনক উপাদান রয়েছে। "
-        else:
-            explanation = "✅ **ঝুঁকি কম মনে হচ্ছে।** এই বার্তায় বড় কোনো সন্দেহজনক লক্ষণ পাওয়া যায়নি। "
-        
+        templates = self._pack.explanations["bn"]
+        explanation = templates.get(risk_level, templates["Low"])
+
+        if red_flags and "flags" in templates:
+            explanation += templates["flags"].format(flags=', '.join(red_flags))
+
         if risk_level in ["High", "Medium"]:
-            explanation += "টাকা বা ব্যক্তিগত তথ্য শেয়ার করার আগে সর্বদা অফিশিয়াল মাধ্যমে পরিচয় যাচাই করুন।"
-        
+            explanation += self._terms_sentence(templates, evidence_terms)
+            explanation += templates["advice"]
+
         return explanation
+
+    @staticmethod
+    def _terms_sentence(templates: Dict[str, str], evidence_terms: Optional[List[str]]) -> str:
+        # Packs written before the "terms" template simply skip the sentence
+        if not evidence_terms or "terms" not in templates:
+            return ""
+        return templates["terms"].format(terms=', '.join(f'"{term}"' for term in evidence_terms))
+
+
+def evaluate_message(text: str) -> RuleResult:
+    """Executor entry point: evaluate with this process's shared engine (picklable)"""
+    return _worker_engine().evaluate(text)
+
+
+def evaluate_messages(texts: List[str]) -> List[RuleResult]:
+    """Executor entry point for batches"""
+    return _worker_engine().check_messages(texts)
+
+
+_last_worker_reload = 0.0
+
+def _worker_engine() -> RulesEngine:
+    """
+    The shared engine. Executor child processes have no watcher task, so
+    they check the pack file themselves at the reload interval.
+    """
+    global _last_worker_reload
+    engine = get_rules_engine()
+    if RULE_PACK_RELOAD_INTERVAL > 0 and multiprocessing.parent_process() is not None:
+        now = time.monotonic()
+        if now - _last_worker_reload >= RULE_PACK_RELOAD_INTERVAL:
+            _last_worker_reload = now
+            engine.reload_if_changed()
+    return engine
+
+
+async def watch_rule_pack(engine: RulesEngine, interval: float = RULE_PACK_RELOAD_INTERVAL):
+    """Background task: poll the pack file and hot-swap it when it changes"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Compile off the event loop; the swap itself is a reference assignment
+            await asyncio.to_thread(engine.reload_if_changed)
+        except Exception as e:
+            logger.error(f"Rule pack watcher error: {e}")
+
+
+# Global rules engine instance (stateless, safe to share across requests)
+_rules_engine = None
+
+def get_rules_engine() -> RulesEngine:
+    """Get or create the shared rules engine"""
+    global _rules_engine
+    if _rules_engine is None:
+        _rules_engine = RulesEngine()
+    return _rules_engine
@@ -1,14 +1,25 @@
 import os
+import asyncio
+import copy
 import json
 import logging
-from typing import Dict, List, Optional
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional
 
 # LangChain imports
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.runnables import RunnablePassthrough
 
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.llm_cache import LLMResponseCacheStore
+from app.llm_client import get_llm_clients
+from app.llm_scheduler import LLMScheduler, LLMShedError, PRIORITY_ANONYMOUS
+from app.loop_bridge import get_loop_bridge
+from app.metrics import metrics
+from app.single_flight import SingleFlight
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AIService")
@@ -18,6 +29,27 @@ os.environ["LANGCHAIN_TRACING_V2"] = "true"
 os.environ["LANGCHAIN_API_KEY"] = os.getenv("LANGCHAIN_API_KEY", "")
 os.environ["LANGCHAIN_PROJECT"] = os.getenv("LANGCHAIN_PROJECT", "checkbhai-backend")
 
+LLM_MODEL = "gpt-4o-mini"
+
+# Part of every LLM cache key: bump whenever the prompt or output handling
+# changes, so analyses from the old prompt are never served
+PROMPT_VERSION = "risk-analysis-v1"
+
+# Seconds one chain call may take before the caller gets the template explanation
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "8"))
+
+# Circuit breaker: trip after this many consecutive failures/timeouts ...
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+# ... or when this share of the last LLM_BREAKER_WINDOW calls took over LLM_BREAKER_SLOW_MS
+LLM_BREAKER_SLOW_MS = float(os.getenv("LLM_BREAKER_SLOW_MS", "5000"))
+LLM_BREAKER_SLOW_RATE = float(os.getenv("LLM_BREAKER_SLOW_RATE", "0.5"))
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+# Seconds the breaker stays open before a half-open probe call
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Response fields streamed to clients as the model writes them
+STREAMED_FIELDS = ("explanation_en", "explanation_bn")
+
 class LangChainAIService:
     """AI Service using LangChain with LangSmith tracing"""
 
@@ -25,6 +57,21 @@ class LangChainAIService:
         self.llm = None
         self.chain = None
         self.is_available = False
+        self.cache = LLMResponseCacheStore(prompt_version=PROMPT_VERSION, model=LLM_MODEL)
+        # Concurrent requests for the same normalized message share one chain call
+        self.single_flight = SingleFlight(name="llm.single_flight")
+        # Concurrency cap, rate limit and priority queue for chain calls
+        self.scheduler = LLMScheduler()
+        self.breaker = CircuitBreaker(
+            "llm.breaker",
+            failure_threshold=LLM_BREAKER_FAILURES,
+            reset_seconds=LLM_BREAKER_RESET_SECONDS,
+            # Any probe call ends by its deadline; one still "in flight" after that was lost
+            probe_timeout=LLM_DEADLINE_SECONDS * 2,
+            slow_call_ms=LLM_BREAKER_SLOW_MS,
+            slow_call_rate=LLM_BREAKER_SLOW_RATE,
+            window=LLM_BREAKER_WINDOW
+        )
 
         # Initialize LangChain components
         self._initialize_langchain()
@@ -32,17 +79,16 @@ class LangChainAIService:
     def _initialize_langchain(self):
         """Initialize LangChain components with graceful fallback"""
         try:
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-            if not openai_api_key:
+            llm_clients = get_llm_clients()
+            if not llm_clients.available:
                 logger.warning("OPENAI_API_KEY not found - AI analysis disabled")
                 return
 
-            # Initialize ChatOpenAI with LangChain
-            self.llm = ChatOpenAI(
-                model="gpt-4o-mini",
+            # Initialize ChatOpenAI with LangChain, on the shared connection pool
+            self.llm = llm_clients.chat_model(
+                model=LLM_MODEL,
                 temperature=0.1,  # Lower temperature for more consistent, stable results
-                max_tokens=1000,
-                api_key=openai_api_key
+                max_tokens=1000
             )
 
             # Create prompt template for risk analysis
@@ -91,41 +137,180 @@ Respond with a JSON object containing:
             logger.error(f"Failed to initialize LangChain AI Service: {e}")
             self.is_available = False
 
-    async def analyze_message(self, text: str) -> Dict:
+    async def analyze_message(self, text: str, priority: int = PRIORITY_ANONYMOUS) -> Dict:
         """
-        Analyze message using LangChain with LangSmith tracing
+        Analyze message using LangChain with LangSmith tracing.
+        priority orders the call in the LLM scheduler (see app.llm_scheduler).
         """
         if not self.is_available or not self.chain:
             logger.warning("AI Service not available - returning fallback response")
             return self._get_fallback_response()
 
+        cache_key = self.cache.key(text)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            logger.info(f"Analyzing message with LangChain: {text[:50]}...")
-
-            # Run chain with tracing
-            result = await self.chain.ainvoke({"text": text})
-
-            # Ensure required fields are present and terminology is mapped correctly
-            result.setdefault("risk_level", "Low")
-            result.setdefault("confidence_score", 0.5)
-            result.setdefault("explanation_en", "Analysis based on message patterns.")
-            result.setdefault("explanation_bn", "বার্তার প্যাটার্ন ভিত্তিক বিশ্লেষণ।")
-            result.setdefault("red_flags", [])
-            result.setdefault("category", "other")
-            
-            # Map for backward compatibility if needed by other modules
-            result["is_scam"] = result.get("risk_level") == "High"
-            result["confidence"] = result.get("confidence_score", 0.5)
-
-            logger.info(f"AI Analysis completed - Risk: {result.get('risk_level', 'Unknown')}")
-            return result
+            # The cache key is the normalized-text hash, so it also identifies identical in-flight calls
+            # Joiners of an in-flight call share the priority of the call that started it
+            result, _ = await self.single_flight.do(cache_key, lambda: self._invoke_chain(text, cache_key, priority))
+            # Every caller gets its own copy of the shared result
+            return copy.deepcopy(result)
 
+        except CircuitOpenError:
+            return self._get_fallback_response("circuit_open")
+        except LLMShedError as e:
+            logger.warning(f"LangChain analysis shed: {e}")
+            return self._get_fallback_response("shed")
+        except asyncio.TimeoutError:
+            logger.warning(f"LangChain analysis exceeded the {LLM_DEADLINE_SECONDS}s deadline")
+            return self._get_fallback_response("deadline")
         except Exception as e:
             logger.error(f"LangChain analysis failed: {e}")
-            return self._get_fallback_response()
+            return self._get_fallback_response("error")
 
-    def _get_fallback_response(self) -> Dict:
-        """Fallback response when AI is unavailable"""
+    async def _invoke_chain(self, text: str, cache_key: str, priority: int) -> Dict:
+        """
+        One chain call in a scheduler slot, under the deadline and the circuit
+        breaker; raises on failure so every coalesced caller sees it
+        """
+        # Fail fast: while the breaker rejects calls, don't queue for a slot or spend rate tokens
+        if not self.breaker.available():
+            raise CircuitOpenError("LLM circuit breaker is open")
+        async with self.scheduler.slot(priority):
+            return await self._call_chain(text, cache_key)
+
+    async def _call_chain(self, text: str, cache_key: str) -> Dict:
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+        logger.info(f"Analyzing message with LangChain: {text[:50]}...")
+        started = time.perf_counter()
+        try:
+            # Run chain with tracing; wait_for cancels the provider call at the deadline
+            result = await asyncio.wait_for(self.chain.ainvoke({"text": text}), timeout=LLM_DEADLINE_SECONDS)
+        except asyncio.CancelledError:
+            # A cancelled half-open probe must still release its slot
+            self.breaker.record_cancelled()
+            raise
+        except Exception as e:
+            self.breaker.record_failure("deadline exceeded" if isinstance(e, asyncio.TimeoutError) else type(e).__name__)
+            raise
+        self.breaker.record_success((time.perf_counter() - started) * 1000)
+
+        result = self._complete_result(result)
+        # Fallback responses are never cached: the next request retries the LLM
+        await self.cache.set(cache_key, result)
+        return result
+
+    async def stream_message(self, text: str, priority: int = PRIORITY_ANONYMOUS) -> AsyncIterator[Dict]:
+        """
+        analyze_message, streamed. Yields
+            {"type": "delta", "field": "explanation_en"|"explanation_bn", "text": ...}
+        as the model writes each explanation, then exactly one
+            {"type": "result", "result": {...}}
+        with the complete (or fallback) analysis. Cached analyses arrive as the
+        result alone. Streams are not coalesced: each one is its own chain call,
+        under the same scheduler, deadline, breaker and cache as analyze_message.
+        """
+        if not self.is_available or not self.chain:
+            yield {"type": "result", "result": self._get_fallback_response()}
+            return
+
+        cache_key = self.cache.key(text)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            yield {"type": "result", "result": cached}
+            return
+
+        if not self.breaker.available():
+            yield {"type": "result", "result": self._get_fallback_response("circuit_open")}
+            return
+
+        # The slot is held for the whole stream; aclosing() closes the chain stream
+        # as soon as this generator is closed, instead of whenever it is collected
+        try:
+            async with self.scheduler.slot(priority):
+                async with aclosing(self._stream_chain(text, cache_key)) as events:
+                    async for event in events:
+                        yield event
+        except LLMShedError as e:
+            logger.warning(f"LangChain stream shed: {e}")
+            yield {"type": "result", "result": self._get_fallback_response("shed")}
+
+    async def _stream_chain(self, text: str, cache_key: str) -> AsyncIterator[Dict]:
+        if not self.breaker.allow():
+            yield {"type": "result", "result": self._get_fallback_response("circuit_open")}
+            return
+
+        logger.info(f"Streaming message analysis with LangChain: {text[:50]}...")
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        deadline = loop.time() + LLM_DEADLINE_SECONDS
+        sent = {field: 0 for field in STREAMED_FIELDS}
+        result = None
+        # Every exit must report to the breaker, or a half-open probe stays in flight
+        recorded = False
+        # JsonOutputParser streams the partial object parsed so far
+        partials = self.chain.astream({"text": text}).__aiter__()
+        try:
+            while True:
+                try:
+                    result = await asyncio.wait_for(partials.__anext__(), timeout=deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                for field in STREAMED_FIELDS:
+                    value = result.get(field) if isinstance(result, dict) else None
+                    if isinstance(value, str) and len(value) > sent[field]:
+                        yield {"type": "delta", "field": field, "text": value[sent[field]:]}
+                        sent[field] = len(value)
+            if not isinstance(result, dict):
+                raise ValueError("LLM stream ended without a JSON object")
+            self.breaker.record_success((time.perf_counter() - started) * 1000)
+            recorded = True
+        except asyncio.TimeoutError:
+            self.breaker.record_failure("deadline exceeded")
+            recorded = True
+            logger.warning(f"LangChain stream exceeded the {LLM_DEADLINE_SECONDS}s deadline")
+            yield {"type": "result", "result": self._get_fallback_response("deadline")}
+            return
+        except Exception as e:
+            self.breaker.record_failure(type(e).__name__)
+            recorded = True
+            logger.error(f"LangChain stream failed: {e}")
+            yield {"type": "result", "result": self._get_fallback_response("error")}
+            return
+        finally:
+            if not recorded:
+                # Cancelled, or closed by the consumer (client disconnected, aclose()):
+                # not the provider's fault
+                self.breaker.record_cancelled()
+            await partials.aclose()
+
+        result = self._complete_result(result)
+        await self.cache.set(cache_key, result)
+        yield {"type": "result", "result": copy.deepcopy(result)}
+
+    def _complete_result(self, result: Dict) -> Dict:
+        # Ensure required fields are present and terminology is mapped correctly
+        result.setdefault("risk_level", "Low")
+        result.setdefault("confidence_score", 0.5)
+        result.setdefault("explanation_en", "Analysis based on message patterns.")
+        result.setdefault("explanation_bn", "বার্তার প্যাটার্ন ভিত্তিক বিশ্লেষণ।")
+        result.setdefault("red_flags", [])
+        result.setdefault("category", "other")
+        
+        # Map for backward compatibility if needed by other modules
+        result["is_scam"] = result.get("risk_level") == "High"
+        result["confidence"] = result.get("confidence_score", 0.5)
+
+        logger.info(f"AI Analysis completed - Risk: {result.get('risk_level', 'Unknown')}")
+        return result
+
+    def _get_fallback_response(self, reason: str = "unavailable") -> Dict:
+        """Fallback response when AI is unavailable, failing, too slow or circuit-broken"""
+        metrics.counter(f"llm.fallback.{reason}").inc()
         return {
             "is_scam": False,
             "risk_level": "Low",
@@ -135,35 +320,13 @@ Respond with a JSON object containing:
             "explanation_bn": "AI বিশ্লেষণ বর্তমানে অনুপলব্ধ। শুধুমাত্র নিয়ম-ভিত্তিক বিশ্লেষণ প্রয়োগ করা হয়েছে।",
             "red_flags": [],
             "category": "other",
-            "provider": "fallback"
+            "provider": "fallback",
+            "fallback_reason": reason
         }
 
     def analyze_sync(self, text: str) -> Dict:
-        """Synchronous wrapper for legacy compatibility"""
-        import asyncio
-        import threading
-
-        def run_in_new_loop(coro):
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(coro)
-            finally:
-                loop.close()
-
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # Use a thread for sync call if loop is running
-                from concurrent.futures import ThreadPoolExecutor
-                with ThreadPoolExecutor() as executor:
-                    future = executor.submit(run_in_new_loop, self.analyze_message(text))
-                    return future.result()
-            else:
-                return loop.run_until_complete(self.analyze_message(text))
-        except (RuntimeError, Exception) as e:
-            # Fallback for sync
-            return asyncio.run(self.analyze_message(text))
+        """Synchronous wrapper for legacy compatibility (runs on the shared loop bridge)"""
+        return get_loop_bridge().run(self.analyze_message(text))
 
 # Global singleton
 _ai_service = None
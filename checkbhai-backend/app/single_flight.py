@@ -0,0 +1,62 @@
+"""
+CheckBhai Single-Flight - One in-flight call per key
+When many requests ask for the same thing at once (a viral SMS pasted by
+hundreds of users), the first caller runs the call and everyone else awaits
+the same task. The result, or the exception, is delivered to every waiter.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+from app.metrics import metrics
+
+R = TypeVar("R")
+
+
+class SingleFlight(Generic[R]):
+    """
+    Coalesces concurrent do(key, fn) calls on the same event loop. The call
+    runs as its own task, so a cancelled caller never cancels it for the
+    others; the key is released as soon as the task finishes (no caching).
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self._inflight: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+        self._calls = metrics.counter(f"{name}.calls")
+        self._coalesced = metrics.counter(f"{name}.coalesced")
+        self._in_flight = metrics.gauge(f"{name}.in_flight")
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[R]]) -> Tuple[R, bool]:
+        """
+        Await fn() once for all concurrent callers with this key.
+        Returns (result, shared): shared is True for callers that joined a
+        call started by someone else.
+        """
+        loop = asyncio.get_running_loop()
+        # Tasks belong to one loop; callers on other loops (sync wrappers) never share
+        flight_key = (id(loop), key)
+        task = self._inflight.get(flight_key)
+        shared = task is not None
+        if shared:
+            self._coalesced.inc()
+        else:
+            self._calls.inc()
+            task = loop.create_task(fn())
+            self._inflight[flight_key] = task
+            self._in_flight.set(len(self._inflight))
+            task.add_done_callback(lambda _: self._release(flight_key, task))
+        return await asyncio.shield(task), shared
+
+    def _release(self, flight_key: Tuple[int, Hashable], task: asyncio.Task):
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        self._in_flight.set(len(self._inflight))
+        if not task.cancelled():
+            task.exception()  # retrieved here so an unawaited failure is not logged as lost
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self._calls.value,
+            "coalesced": self._coalesced.value,
+            "in_flight": len(self._inflight)
+        }
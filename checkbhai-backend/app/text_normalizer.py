@@ -0,0 +1,47 @@
+"""
+CheckBhai Text Normalizer - Canonical form for English, Bangla, and Banglish
+Computed once per distinct message and shared by the rules engine, the local
+classifier and the LLM cache key.
+"""
+
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+# Memoized canonical forms (repeat/forwarded messages are the common case)
+NORMALIZE_CACHE_SIZE = int(os.getenv("TEXT_NORMALIZE_CACHE_SIZE", "2048"))
+
+# Zero-width characters that split keywords without changing how text looks
+ZERO_WIDTH_CHARS = {
+    0x200B: None,  # zero width space
+    0x200C: None,  # zero width non-joiner
+    0x200D: None,  # zero width joiner
+    0x2060: None,  # word joiner
+    0xFEFF: None,  # byte order mark
+}
+
+# Bangla digits (০-৯) to ASCII
+BANGLA_DIGITS = {0x09E6 + i: str(i) for i in range(10)}
+
+TRANSLATION_TABLE = {**ZERO_WIDTH_CHARS, **BANGLA_DIGITS}
+
+# A letter repeated three or more times ("urgeeent", "plzzzz"); digits are
+# left alone so amounts like 1000 survive.
+ELONGATION_PATTERN = re.compile(r'([^\W\d_])\1{2,}')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of a message:
+    NFC, zero-width characters removed, Bangla digits as ASCII, lowercase,
+    letter elongations collapsed and whitespace runs squeezed.
+    """
+    text = unicodedata.normalize('NFC', text)
+    text = text.translate(TRANSLATION_TABLE)
+    text = text.lower()
+    text = ELONGATION_PATTERN.sub(r'\1', text)
+    text = WHITESPACE_PATTERN.sub(' ', text)
+    return text.strip()
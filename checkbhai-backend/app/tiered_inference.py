@@ -0,0 +1,88 @@
+"""
+CheckBhai Tiered Inference - Decide how far down the pipeline a message goes
+    rules       decisive rules score (nothing fired, or clearly High): done
+    classifier  the local classifier is confident and agrees with the rules
+    llm         rules and classifier are uncertain or disagree, or the caller
+                asked for the LLM explanation
+The risk level always comes from the rules; tiers only decide which
+explanation is worth paying for. Counters: tiers.<tier> and
+tiers.<tier>.<reason>.
+"""
+
+import os
+from typing import Dict, NamedTuple, Optional
+
+from app.metrics import metrics
+
+# Rules scores at or below LOW / at or above HIGH need no further evidence
+TIER_RULES_DECISIVE_LOW = int(os.getenv("TIER_RULES_DECISIVE_LOW", "0"))
+TIER_RULES_DECISIVE_HIGH = int(os.getenv("TIER_RULES_DECISIVE_HIGH", "60"))
+
+# Classifier probability (either class) that counts as confident
+TIER_CLASSIFIER_CONFIDENCE = float(os.getenv("TIER_CLASSIFIER_CONFIDENCE", "0.8"))
+
+TIERS = ("rules", "classifier", "llm")
+
+
+class TierDecision(NamedTuple):
+    tier: str
+    reason: str
+
+
+class TieredInference:
+    """Stateless policy plus per-worker counters"""
+
+    def __init__(self, decisive_low: int = TIER_RULES_DECISIVE_LOW, decisive_high: int = TIER_RULES_DECISIVE_HIGH,
+                 classifier_confidence: float = TIER_CLASSIFIER_CONFIDENCE):
+        self.decisive_low = decisive_low
+        self.decisive_high = decisive_high
+        self.classifier_confidence = classifier_confidence
+
+    def rules_decisive(self, risk_score: int) -> bool:
+        return risk_score <= self.decisive_low or risk_score >= self.decisive_high
+
+    def decide(self, risk_score: int, risk_level: str, scam_probability: Optional[float],
+               llm_requested: bool = False) -> TierDecision:
+        """Pick the tier for one message and count it"""
+        if llm_requested:
+            decision = TierDecision("llm", "requested")
+        elif self.rules_decisive(risk_score):
+            decision = TierDecision("rules", "decisive")
+        elif scam_probability is None:
+            decision = TierDecision("llm", "no_classifier")
+        else:
+            agrees = (scam_probability >= 0.5) == (risk_level != "Low")
+            confident = max(scam_probability, 1 - scam_probability) >= self.classifier_confidence
+            if agrees and confident:
+                decision = TierDecision("classifier", "confident")
+            else:
+                decision = TierDecision("llm", "uncertain" if agrees else "disagreement")
+        metrics.counter(f"tiers.{decision.tier}").inc()
+        metrics.counter(f"tiers.{decision.tier}.{decision.reason}").inc()
+        return decision
+
+    def stats(self) -> Dict:
+        """Share of traffic that stopped at each tier (this worker)"""
+        counters = metrics.snapshot("tiers")["counters"]
+        totals = {tier: counters.get(f"tiers.{tier}", 0) for tier in TIERS}
+        decided = sum(totals.values())
+        return {
+            "thresholds": {
+                "rules_decisive_low": self.decisive_low,
+                "rules_decisive_high": self.decisive_high,
+                "classifier_confidence": self.classifier_confidence
+            },
+            "decided": decided,
+            "share": {tier: round(count / decided, 4) if decided else None for tier, count in totals.items()},
+            "counters": counters
+        }
+
+
+# Global policy
+_tiered_inference = None
+
+def get_tiered_inference() -> TieredInference:
+    global _tiered_inference
+    if _tiered_inference is None:
+        _tiered_inference = TieredInference()
+    return _tiered_inference
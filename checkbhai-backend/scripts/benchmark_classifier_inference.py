@@ -0,0 +1,88 @@
+"""
+CheckBhai Classifier Inference Benchmark
+Compares single-message scoring through the sklearn Pipeline with the
+pure-NumPy NumpyClassifier: latency per message, peak memory allocated
+while scoring one message (tracemalloc), and the largest probability
+difference between the two.
+
+Usage:
+    cd checkbhai-backend
+    python scripts/benchmark_classifier_inference.py
+"""
+
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, '.')
+
+from app.ai_engine import AIEngine
+from app.classifier_artifact import ClassifierArtifact
+from app.classifier_inference import NumpyClassifier
+from app.text_normalizer import normalize_text
+from app.training_data import get_training_data
+
+MESSAGE_LENGTHS = [50, 200, 1000, 5000]
+REPEATS = 200
+
+
+def sample_messages(length: int) -> list:
+    """Training texts repeated/truncated to roughly the requested length"""
+    messages = []
+    for item in get_training_data():
+        text = item['text']
+        while len(text) < length:
+            text = text + " " + item['text']
+        messages.append(normalize_text(text[:length]))
+    return messages
+
+
+def allocated_per_call(score, message: str, calls: int = 50) -> float:
+    """Peak bytes of transient allocations while scoring the message"""
+    score(message)  # warm caches
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(calls):
+        score(message)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - before
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        engine = AIEngine(model_path=os.path.join(directory, "scam_classifier.pkl"))
+        pipeline = engine.model
+        scorer = NumpyClassifier.from_artifact(ClassifierArtifact(engine.artifact_path))
+
+        messages = sample_messages(200)
+        difference = np.abs(pipeline.predict_proba(messages) - scorer.predict_proba(messages)).max()
+        print(f"Max |pipeline - numpy| probability difference: {difference:.2e}")
+        print()
+
+        header = f"{'chars':>6} | {'sklearn us':>11} | {'numpy us':>9} | {'speedup':>7} | {'sklearn peak KB':>15} | {'numpy peak KB':>13}"
+        print(header)
+        print("-" * len(header))
+
+        for length in MESSAGE_LENGTHS:
+            message = sample_messages(length)[0]
+            sklearn_score = lambda text: pipeline.predict_proba([text])
+            numpy_score = lambda text: scorer.predict_proba([text])
+
+            sklearn_us = min(timeit.repeat(lambda: sklearn_score(message), number=REPEATS, repeat=3)) / REPEATS * 1e6
+            numpy_us = min(timeit.repeat(lambda: numpy_score(message), number=REPEATS, repeat=3)) / REPEATS * 1e6
+            sklearn_kb = allocated_per_call(sklearn_score, message) / 1024
+            numpy_kb = allocated_per_call(numpy_score, message) / 1024
+
+            print(f"{length:>6} | {sklearn_us:>11.1f} | {numpy_us:>9.1f} | {sklearn_us / numpy_us:>6.1f}x | "
+                  f"{sklearn_kb:>15.1f} | {numpy_kb:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
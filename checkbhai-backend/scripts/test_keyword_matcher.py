@@ -0,0 +1,51 @@
+"""
+CheckBhai Keyword Matcher Test Script
+Checks TokenMatcher recall on inflected keywords and that whole-token
+matching still rejects keywords inside longer words.
+
+Usage:
+    cd checkbhai-backend
+    python scripts/test_keyword_matcher.py
+"""
+
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, '.')
+
+from app.keyword_matcher import TokenMatcher
+
+KEYWORDS = {
+    "verification": {"english": ["verify", "confirm"]},
+    "link": {"english": ["click", "share"]},
+    "prize": {"english": ["win", "claim", "fee"]},
+    "urgency": {"english": ["now"]},
+    "money": {"bangla_unicode": ["টাকা"]},
+}
+
+# (message, categories the matcher must find)
+EXPECTED = [
+    ("your account needs verification", {"verification"}),
+    ("account verified, confirmation pending", {"verification"}),
+    ("clicking the link below", {"link"}),
+    ("he clicked and shared the code", {"link"}),
+    ("you are winning, claims close soon, fees apply", {"prize"}),
+    ("৫০০ টাকার অফার", {"money"}),
+    # Whole tokens only: no keyword inside a longer word
+    ("i know the window is clickbait", set()),
+    ("seed bus news", set()),
+]
+
+
+def test_inflected_recall():
+    matcher = TokenMatcher.from_keyword_dicts(KEYWORDS)
+    for message, expected in EXPECTED:
+        found = matcher.categories(message)
+        assert found == expected, f"{message!r}: expected {expected}, got {found}"
+        print(f"  ✓ {message!r} -> {sorted(found)}")
+
+
+if __name__ == "__main__":
+    print("Keyword matcher recall")
+    test_inflected_recall()
+    print("All keyword matcher checks passed")
@@ -0,0 +1,40 @@
+"""
+CheckBhai LLM Client Test Script
+Checks that both LLM clients run on the shared connection pool with the
+LLM_HTTP_* timeouts actually in effect per request (the OpenAI clients
+would otherwise override them with their own). No network needed.
+
+Usage:
+    cd checkbhai-backend
+    python scripts/test_llm_client.py
+"""
+
+import sys
+
+import httpx
+
+# Add parent directory to path
+sys.path.insert(0, '.')
+
+from app.llm_client import LLMClients
+
+
+def test_effective_timeouts():
+    clients = LLMClients(api_key="sk-test", connect_timeout=2, timeout=12)
+    expected = httpx.Timeout(12, connect=2)
+
+    assert clients.http.timeout == expected
+    assert clients.openai.timeout == expected, clients.openai.timeout
+    assert clients.openai._client is clients.http
+
+    chat = clients.chat_model(model="gpt-4o-mini")
+    assert chat.request_timeout == expected, chat.request_timeout
+    assert chat.root_async_client.timeout == expected, chat.root_async_client.timeout
+    assert chat.root_async_client._client is clients.http
+    print(f"  ✓ OpenAI and ChatOpenAI share the pool with {expected}")
+
+
+if __name__ == "__main__":
+    print("LLM clients")
+    test_effective_timeouts()
+    print("All LLM client checks passed")
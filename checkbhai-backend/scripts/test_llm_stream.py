@@ -0,0 +1,119 @@
+"""
+CheckBhai LLM Stream Test Script
+Checks that a streamed LLM analysis always reports back to the circuit
+breaker: a client that disconnects after the first delta (the generator is
+closed) must not leave a half-open probe in flight, a probe that is lost
+anyway is given up on after the probe timeout, and calls the breaker would
+reject get the fallback without queueing for a scheduler slot. Uses a fake
+chain; no API key or network needed.
+
+Usage:
+    cd checkbhai-backend
+    python scripts/test_llm_stream.py
+"""
+
+import asyncio
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, '.')
+
+from app.circuit_breaker import CLOSED, HALF_OPEN, CircuitBreaker
+from app.services.ai_service import LangChainAIService
+
+
+class FakeStreamingChain:
+    """Streams a JSON analysis as growing partial objects"""
+
+    async def astream(self, inputs):
+        explanation = "Asks for an advance payment over bKash."
+        for end in range(8, len(explanation) + 1, 8):
+            await asyncio.sleep(0.01)
+            yield {"explanation_en": explanation[:end]}
+        yield {"explanation_en": explanation, "explanation_bn": "অগ্রিম টাকা চাওয়া হয়েছে।", "red_flags": []}
+
+
+def half_open_service() -> LangChainAIService:
+    service = LangChainAIService()
+    service.chain = FakeStreamingChain()
+    service.is_available = True
+    service.cache.persistent = False
+    service.breaker = CircuitBreaker("test.breaker", failure_threshold=1, reset_seconds=0)
+    service.breaker.record_failure("test")  # open; reset_seconds=0 makes the next allow() the probe
+    return service
+
+
+async def close_after_first_delta(service: LangChainAIService, text: str):
+    stream = service.stream_message(text)
+    event = await stream.__anext__()
+    assert event["type"] == "delta", event
+    assert service.breaker.state == HALF_OPEN
+    await stream.aclose()
+    # Checked on the same loop: asyncio.run() finalizing leftover generators must not be what frees it
+    assert service.breaker.allow(), "probe slot still held after the stream was closed"
+
+
+def test_closed_stream_releases_probe():
+    service = half_open_service()
+    asyncio.run(close_after_first_delta(service, "Send 5000 taka bkash advance to 01711111111"))
+    print("  ✓ closing the stream after the first delta releases the half-open probe")
+
+
+def test_full_stream_closes_breaker():
+    service = half_open_service()
+
+    async def consume():
+        return [event async for event in service.stream_message("Send 7000 taka bkash advance to 01822222222")]
+
+    events = asyncio.run(consume())
+    assert events[-1]["type"] == "result" and events[-1]["result"].get("provider") != "fallback", events[-1]
+    assert service.breaker.state == CLOSED
+    print("  ✓ a completed stream closes the breaker")
+
+
+class NoSlotScheduler:
+    """Fails the test if a call queues for a slot"""
+
+    def slot(self, priority=None, timeout=None):
+        raise AssertionError("queued for a scheduler slot while the breaker rejects calls")
+
+
+def test_open_breaker_skips_scheduler():
+    service = half_open_service()
+    service.breaker.reset_seconds = 60  # stays open
+    service.scheduler = NoSlotScheduler()
+
+    async def consume():
+        result = await service.analyze_message("Send 9000 taka bkash advance to 01933333333")
+        events = [event async for event in service.stream_message("Send 9000 taka bkash advance to 01933333333")]
+        return result, events
+
+    result, events = asyncio.run(consume())
+    assert result.get("fallback_reason") == "circuit_open", result
+    assert [event["type"] for event in events] == ["result"], events
+    assert events[0]["result"].get("fallback_reason") == "circuit_open", events[0]
+
+    # Half-open with the probe in flight rejects everyone else too
+    probing = half_open_service()
+    assert probing.breaker.allow() and not probing.breaker.available()
+    print("  ✓ an open breaker returns the fallback without queueing for a slot")
+
+
+def test_lost_probe_times_out():
+    breaker = CircuitBreaker("test.lost_probe", failure_threshold=1, reset_seconds=0, probe_timeout=0.05)
+    breaker.record_failure("test")
+    assert breaker.allow()  # the probe, which never reports back
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow(), "lost probe still blocks the breaker after probe_timeout"
+    print("  ✓ a lost probe is given up on after probe_timeout")
+
+
+if __name__ == "__main__":
+    print("LLM stream / circuit breaker")
+    test_closed_stream_releases_probe()
+    test_full_stream_closes_breaker()
+    test_open_breaker_skips_scheduler()
+    test_lost_probe_times_out()
+    print("All LLM stream checks passed")
@@ -0,0 +1,129 @@
+"""
+CheckBhai Near-Duplicate Test Script
+Checks that a reused LLM explanation fits the new message: a near-identical
+message the rules judge differently (a delivery notice with " Send OTP."
+appended) must go to the LLM, and campaign variants with the same verdict
+still reuse the analysis with their own identifiers swapped in - whole
+identifiers only, never inside a longer number or link, and only when they
+pair up one-to-one. Uses the real rules
+engine; no API key or database needed.
+
+Usage:
+    cd checkbhai-backend
+    python scripts/test_near_duplicate.py
+"""
+
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, '.')
+
+from app.metrics import metrics
+from app.near_duplicate import NearDuplicateIndex, canonical_form, mask_identifiers
+from app.rules_engine import evaluate_message
+
+DELIVERY_NOTICE = (
+    "Dear customer, your parcel DH123456 from Daraz has arrived at our Mirpur hub and will be "
+    "delivered today between 2pm and 6pm. Please keep your phone on. Track at www.dhl-bd.com/track"
+)
+
+DELIVERY_ANALYSIS = {
+    "explanation_en": "This looks like a routine delivery notice for parcel DH123456.",
+    "explanation_bn": "এটি পার্সেল DH123456 এর একটি সাধারণ ডেলিভারি বার্তা।",
+    "red_flags": [],
+}
+
+CAMPAIGN = "Congratulations! You won a prize. Sudhu 3000 taka processing fee bKash korun 01711111111 ekhon."
+
+CAMPAIGN_ANALYSIS = {
+    "explanation_en": "Asks for a 3000 taka fee to 01711111111 before releasing a prize.",
+    "explanation_bn": "পুরস্কারের আগে 01711111111 নম্বরে ৩০০০ টাকা ফি চাওয়া হয়েছে।",
+    "red_flags": ["Advance fee"],
+}
+
+
+def indexed(text: str, ai_result: dict) -> NearDuplicateIndex:
+    index = NearDuplicateIndex()
+    verdict = evaluate_message(text)
+    index.add(text, ai_result, verdict.risk_level, list(verdict.red_flags))
+    return index
+
+
+def test_changed_verdict_is_not_reused():
+    index = indexed(DELIVERY_NOTICE, DELIVERY_ANALYSIS)
+    edited = DELIVERY_NOTICE + " Send OTP."
+    before, after = evaluate_message(DELIVERY_NOTICE), evaluate_message(edited)
+    assert (before.risk_level, after.risk_level) == ("Low", "High"), (before.risk_level, after.risk_level)
+
+    similarity = float(
+        (index.signature(canonical_form(DELIVERY_NOTICE)[0]) == index.signature(canonical_form(edited)[0])).mean()
+    )
+    assert similarity >= index.threshold, f"texts not similar enough to exercise the gate ({similarity})"
+
+    mismatches = metrics.counter("near_dup.verdict_mismatches").value
+    assert index.lookup(edited, after.risk_level, list(after.red_flags)) is None, \
+        "a Low-risk explanation was reused for a High-risk message"
+    assert metrics.counter("near_dup.verdict_mismatches").value == mismatches + 1
+    print(f"  ✓ a {similarity:.2f}-similar message that turned High is sent to the LLM")
+
+
+def test_same_verdict_is_reused():
+    index = indexed(CAMPAIGN, CAMPAIGN_ANALYSIS)
+    variant = CAMPAIGN.replace("3000", "2500").replace("01711111111", "01822222222")
+    verdict = evaluate_message(variant)
+    match = index.lookup(variant, verdict.risk_level, list(verdict.red_flags))
+    assert match is not None, "campaign variant with the same verdict was not reused"
+
+    adapted = index.adapt(match, variant)
+    assert adapted["explanation_en"] == "Asks for a 2500 taka fee to 01822222222 before releasing a prize.", adapted
+    assert "০১৮২২২২২২২২" not in adapted["explanation_bn"] and "01822222222" in adapted["explanation_bn"]
+    assert "২৫০০" in adapted["explanation_bn"], adapted["explanation_bn"]
+    assert set(verdict.red_flags) <= set(adapted["red_flags"]) and "Advance fee" in adapted["red_flags"]
+    print(f"  ✓ a campaign variant with the same verdict reuses the analysis ({match.similarity:.2f})")
+
+
+def test_unpaired_identifiers_are_not_reused():
+    index = indexed(CAMPAIGN, CAMPAIGN_ANALYSIS)
+    two_phones = CAMPAIGN.replace("01711111111", "01822222222 ba 01933333333")
+    verdict = evaluate_message(two_phones)
+    assert verdict.risk_level == evaluate_message(CAMPAIGN).risk_level
+
+    unpaired = metrics.counter("near_dup.unpaired_identifiers").value
+    assert index.lookup(two_phones, verdict.risk_level, list(verdict.red_flags)) is None, \
+        "an explanation quoting the earlier message's phone number was reused"
+    assert metrics.counter("near_dup.unpaired_identifiers").value == unpaired + 1
+
+    # adapt() refuses too, should it be handed such a match
+    match = index.lookup(CAMPAIGN, verdict.risk_level, list(verdict.red_flags))
+    assert match is not None and index.adapt(match, two_phones) is None
+    print("  ✓ one phone number against two is sent to the LLM")
+
+
+def test_substitution_swaps_whole_identifiers():
+    substitute = NearDuplicateIndex._substitution(
+        mask_identifiers("Sudhu 3000 taka, see https://x.co/a")[1],
+        mask_identifiers("Sudhu 2500 taka, see https://y.co/b")[1]
+    )
+    explanation = "Pay 3000 (not 13000, 3000.5 or 3,000) via https://x.co/a or https://x.co/a/3000. ৩০০০ টাকা. 3000."
+    expected = "Pay 2500 (not 13000, 3000.5 or 3,000) via https://y.co/b or https://x.co/a/3000. ২৫০০ টাকা. 2500."
+    assert substitute(explanation) == expected, substitute(explanation)
+    print("  ✓ identifiers are swapped only where they stand on their own")
+
+
+def test_links_masked_before_normalization():
+    first, first_ids = canonical_form("Claim your prize at www.bkash-offer.com today")
+    second, second_ids = canonical_form("Claim your prize at www.prize-bd.net today")
+    assert first == second, (first, second)
+    assert first_ids == [("url", "www.bkash-offer.com")], first_ids
+    assert mask_identifiers("fee (13000), pay 3000.")[1] == [("number", "13000"), ("number", "3000")]
+    print("  ✓ links are masked before normalization rewrites them")
+
+
+if __name__ == "__main__":
+    print("Near-duplicate reuse")
+    test_changed_verdict_is_not_reused()
+    test_same_verdict_is_reused()
+    test_unpaired_identifiers_are_not_reused()
+    test_substitution_swaps_whole_identifiers()
+    test_links_masked_before_normalization()
+    print("All near-duplicate checks passed")
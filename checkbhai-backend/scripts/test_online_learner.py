@@ -0,0 +1,63 @@
+"""
+CheckBhai Online Learner Test Script
+Checks that an incremental feedback batch costs the batch, not the model or
+the corpus: the corpus is only built for a periodic full refit, and the NB
+model is updated in place rather than copied. Writes its checkpoint to a
+temporary directory.
+
+Usage:
+    cd checkbhai-backend
+    python scripts/test_online_learner.py
+"""
+
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, '.')
+
+from app.online_learner import OnlineClassifier
+from app.text_normalizer import normalize_text
+
+CORPUS = [
+    (normalize_text("Congratulations you won 50000 taka, pay 500 fee to claim"), 1),
+    (normalize_text("Send your bKash PIN to verify your account now"), 1),
+    (normalize_text("Your parcel will be delivered tomorrow between 2pm and 6pm"), 0),
+    (normalize_text("Meeting moved to 3pm, see you at the office"), 0),
+]
+
+
+class CountingCorpus:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return CORPUS
+
+
+def test_incremental_update_skips_corpus_and_copy():
+    with tempfile.TemporaryDirectory() as directory:
+        online = OnlineClassifier(directory, refit_every=3)
+        corpus = CountingCorpus()
+        assert online.partial_fit(["first feedback message"], [0], corpus=corpus)  # bootstraps
+        assert corpus.calls == 1
+
+        clf = online.pipeline.named_steps['clf']
+        seen = clf.class_count_.sum()
+        for _ in range(2):
+            assert not online.partial_fit(["Pay 900 taka processing fee today"], [1], corpus=corpus)
+        assert corpus.calls == 1, "corpus built for an incremental update"
+        assert online.pipeline.named_steps['clf'] is clf, "model copied instead of updated in place"
+        assert clf.class_count_.sum() == seen + 2
+        print("  ✓ incremental updates neither build the corpus nor copy the model")
+
+        assert online.partial_fit(["Pay 900 taka processing fee today"], [1], corpus=corpus)
+        assert corpus.calls == 2
+        print("  ✓ the periodic full refit still uses the corpus")
+
+
+if __name__ == "__main__":
+    print("Online learner")
+    test_incremental_update_skips_corpus_and_copy()
+    print("All online learner checks passed")